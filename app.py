@@ -1,39 +1,72 @@
 import sys
+import os
 import io
+import time
+import hashlib
 import json
 import csv
 import ssl
 import tempfile
 import shutil
+import sqlite3
+import threading
+import re
+import unicodedata
+import bisect
+import importlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, CancelledError
 from pathlib import Path
-from functools import partial
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from collections import OrderedDict, namedtuple
 from urllib.parse import quote
 
+# Startup timing is measured from here (see StartupTimer)
+PROCESS_START = time.perf_counter()
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+
+    def __getattr__(self, attr):
+        if self._mod is None:
+            self._mod = importlib.import_module(self._name)
+        return getattr(self._mod, attr)
+
 import httplib2
 import pickle
 from googleapiclient import errors
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
-
 import google_auth_httplib2
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+
+# Heavy modules the first paint doesn't need
+fitz = LazyModule("fitz")  # PyMuPDF
+np = LazyModule("numpy")
+pandas = LazyModule("pandas")
+discovery = LazyModule("googleapiclient.discovery")
+gapi_http = LazyModule("googleapiclient.http")
+service_account = LazyModule("google.oauth2.service_account")
 
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
+    QApplication, QMainWindow, QTableView, QAbstractItemView, QStyledItemDelegate,
     QPushButton, QFileDialog, QInputDialog, QMessageBox,
     QVBoxLayout, QHBoxLayout, QWidget, QDialog, QDialogButtonBox,
     QComboBox, QLabel, QSplitter, QLineEdit, QDateEdit,
-    QProgressDialog, QTextEdit
+    QProgressDialog, QListWidget, QListWidgetItem, QListView, QTabWidget, QPlainTextEdit
 )
+from PyQt6.QtGui import QIcon, QFontDatabase
 from PyQt6.QtCore import (
     Qt, QUrl, QDate, QObject, QRunnable, QThreadPool,
-    pyqtSignal, pyqtSlot, QSettings, QTimer
+    pyqtSignal, pyqtSlot, QSettings, QTimer,
+    QAbstractTableModel, QAbstractListModel, QModelIndex, QPersistentModelIndex, QSortFilterProxyModel, QSize,
+    QBuffer, QIODevice, QUrlQuery
 )
+# Must be imported before QApplication exists; the view itself is created lazily
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEngineSettings
+from PyQt6.QtWebEngineCore import (
+    QWebEngineSettings, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
+)
 
 # ─── CONFIG ────────────────────────────────────────────────────────────────
 # Path to your Google service account JSON file (must be created in GCP & shared
@@ -63,20 +96,684 @@ REVIEW_FIELDS = [
 ]
 LOG_FIELDS = ["topic", "review_date", "difficulty", "comment"]
 
+# The study log is stored as one append-only CSV segment per month
+# (study_log-YYYY-MM.csv) next to the legacy study_log.csv, so logging a review
+# only re-uploads the current month. Segments are fetched this many at a time.
+LOG_SEGMENT_PREFIX = Path(STUDY_LOG_FILENAME).stem + "-"
+LOG_FETCH_WORKERS = 8
+
 # Local cache directory and path to PDF.js viewer shipped alongside this script.
 LOCAL_CACHE = Path("local_records")
 PDFJS_VIEWER = Path(__file__).parent / "pdfjs" / "web" / "viewer.html"
 
+# Once viewer.html is up, documents are swapped in place through
+# PDFViewerApplication.open (pdf.js >= 4 takes {url}, older releases a plain
+# url). The page/zoom of the last VIEW_STATE_LIMIT files is restored on return.
+# Files that are not cached yet are opened through a PDFDataRangeTransport
+# that pulls byte ranges from srs://file/<id> (see StreamSchemeHandler).
+VIEWER_OPEN_JS = """
+(function (url, stream, page, scale) {
+  const app = window.PDFViewerApplication;
+  const lib = window.pdfjsLib || window["pdfjs-dist/build/pdf"];
+  if (!app || !lib) return false;
+  const go = function () {
+    const restore = function () {
+      app.eventBus.off("pagesinit", restore);
+      if (scale) app.pdfViewer.currentScaleValue = scale;
+      if (page) app.page = page;
+    };
+    app.eventBus.on("pagesinit", restore);
+    const args = { url: url };
+    if (stream) {
+      const transport = new lib.PDFDataRangeTransport(stream.length, null);
+      transport.requestDataRange = function (begin, end) {
+        const xhr = new XMLHttpRequest();
+        xhr.open("GET", stream.src + "?start=" + begin + "&end=" + end);
+        xhr.responseType = "arraybuffer";
+        xhr.onload = function () { transport.onDataRange(begin, new Uint8Array(xhr.response)); };
+        xhr.send();
+      };
+      args.range = transport;
+      args.length = stream.length;
+    }
+    const major = parseInt((lib.version || "0").split(".")[0], 10);
+    major >= 4 ? app.open(args) : app.open(url, args);
+  };
+  app.initializedPromise ? app.initializedPromise.then(go) : go();
+  return true;
+})(%s, %s, %s, %s)
+"""
+VIEWER_STATE_JS = """
+(function () {
+  const app = window.PDFViewerApplication;
+  if (!app || !app.pdfDocument) return null;
+  return { page: app.page, scale: String(app.pdfViewer.currentScaleValue) };
+})()
+"""
+VIEW_STATE_LIMIT = 50
+
+# Local SQLite mirror of review_log.csv. Edits land here first and are pushed
+# to Drive as a single snapshot once they have settled for CSV_FLUSH_DELAY_MS.
+LOCAL_DB = Path("local_state.db")
+CSV_FLUSH_DELAY_MS = 2000
+
+# Study-log appends, calendar changes and Drive deletes are journaled in
+# LOCAL_DB too and drained by the same flush. A failed drain is retried with
+# exponential backoff up to FLUSH_RETRY_MAX_MS (or sooner on the next edit).
+FLUSH_RETRY_MAX_MS = 5 * 60 * 1000
+
+# Private extended property that ties a Calendar event to its topic, and the
+# Calendar API's per-batch request limit.
+CAL_TOPIC_PROPERTY = "srsTopicId"
+CAL_BATCH_SIZE = 50
+
+# LocalStore meta key holding the Drive changes.list page token.
+CHANGES_TOKEN_KEY = "changes_token"
+
+# Drive listing and change feed: results per page (the API maximum), and how
+# many folders are OR-ed together into one `'a' in parents or 'b' in parents`
+# query.
+LIST_PAGE_SIZE = 1000
+LIST_FOLDERS_PER_QUERY = 40
+
+# API transport: seconds before a socket read gives up, and how long before
+# expiry an access token is refreshed.
+HTTP_TIMEOUT = 60
+TOKEN_REFRESH_MARGIN = 300
+
+# Parallel downloads into local_records/. The worker count can be overridden
+# with the "download_workers" QSettings key.
+DOWNLOAD_WORKERS = 6
+DOWNLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+
+# What is in local_records/: file id -> md5, size, modifiedTime, local path.
+CACHE_MANIFEST = Path("local_records.manifest.json")
+FILE_META_FIELDS = "id,name,size,md5Checksum,modifiedTime"
+# Drive accepts at most 100 calls per batch request.
+DRIVE_BATCH_SIZE = 100
+
+# Byte budget for local_records/ (override with the "cache_budget_mb"
+# QSettings key). Files of topics due within CACHE_PROTECT_DAYS are never
+# evicted.
+CACHE_BUDGET_MB = 2048
+CACHE_PROTECT_DAYS = 3
+
+# Background prefetch: topics due within PREFETCH_DAYS are warmed in
+# next_review order, plus the first file of the PREFETCH_ROWS rows below the
+# open one. Thread-pool priorities for user-initiated opens vs prefetch.
+PREFETCH_DAYS = 7
+PREFETCH_ROWS = 2
+OPEN_PRIORITY = 10
+PREFETCH_PRIORITY = -10
+
+# Search: quiet period before a query runs, and how much a hit in each field
+# counts when ranking topics.
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_WEIGHTS = {"topic": 3, "file": 2, "comment": 1}
+
+# Full-text index of cached PDFs (SQLite FTS5), built in the background at
+# INDEX_PRIORITY with text extraction spread over a process pool.
+FULLTEXT_DB = Path("local_records.fulltext.db")
+FULLTEXT_HITS = 200
+INDEX_PRIORITY = -20
+
+# First-page thumbnails, stored as <md5>.png so a changed file gets a new one.
+THUMB_DIR = Path("local_records.thumbs")
+THUMB_WIDTH = 160
+THUMB_PRIORITY = -15
+
+# PDFs that are not cached yet are streamed to the viewer from
+# srs://file/<id>: ranges come from a sparse <file>.stream copy, and missing
+# STREAM_CHUNK_SIZE pieces are fetched from Drive with ranged get_media calls.
+STREAM_SCHEME = b"srs"
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Dashboard: forecast horizon, review-gap histogram edges (days) and how far
+# the fitted retention curve is drawn.
+FORECAST_DAYS = 365
+INTERVAL_BINS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+RETENTION_DAYS = 90
+
+# Load balancing ("load_balance" / "daily_cap" QSettings keys): new due dates
+# are moved within ±FUZZ_FRACTION of the interval (at most FUZZ_MAX_DAYS,
+# none below FUZZ_MIN_INTERVAL days) to the least busy day under the cap; if
+# the whole window is full, the first day with room within SPILL_DAYS after it.
+DAILY_CAP = 30
+FUZZ_FRACTION = 0.1
+FUZZ_MAX_DAYS = 7
+FUZZ_MIN_INTERVAL = 3
+SPILL_DAYS = 30
+
+# Study-log pane: entries shown at first, and how many more each scroll to
+# the bottom pages in.
+LOG_PAGE_SIZE = 50
+
+# Per-phase startup times (imports, credentials, service build, first
+# paint, first sync) are printed once the first sync is done and appended
+# here as one JSON line per run, tagged with a hash of app.py.
+STARTUP_LOG = Path("startup_times.jsonl")
+
+# ─── STARTUP TIMING ──────────────────────────────────────────────────────
+class StartupTimer:
+    """
+    Startup phases in seconds. since_start() records the time from
+    PROCESS_START to a milestone; timed() adds the duration of a call (so
+    lazily built services are counted whenever they happen).
+    """
+    def __init__(self, start):
+        self.start = start
+        self.phases = OrderedDict()
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def since_start(self, name):
+        with self.lock:
+            self.phases.setdefault(name, time.perf_counter() - self.start)
+
+    def timed(self, name, fn, *args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        with self.lock:
+            ms = {name: round(sec * 1000) for name, sec in self.phases.items()}
+        print("Startup:", " · ".join(f"{name} {v} ms" for name, v in ms.items()))
+        record = {
+            "when": datetime.now().isoformat(timespec="seconds"),
+            "build": hashlib.md5(Path(__file__).read_bytes()).hexdigest()[:12],
+            "phases_ms": ms,
+        }
+        try:
+            with open(STARTUP_LOG, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print("Could not write startup timings:", e)
+
+STARTUP = StartupTimer(PROCESS_START)
+
+# ─── REVIEW ROWS ─────────────────────────────────────────────────────────
+FileRef = namedtuple("FileRef", "id name link")
+
+# QDate.toJulianDay() - date.toordinal()
+JULIAN_OFFSET = 1721425
+
+def date_ordinal(text):
+    """'YYYY-MM-DD' -> date ordinal; 0 for blank or malformed dates."""
+    try:
+        return date.fromisoformat(text[:10]).toordinal() if text else 0
+    except ValueError:
+        return 0
+
+def ordinal_str(n):
+    return date.fromordinal(n).isoformat() if n else ""
+
+def ordinal_qdate(n):
+    return QDate.fromJulianDay(n + JULIAN_OFFSET) if n else QDate()
+
+def qdate_ordinal(d):
+    return d.toJulianDay() - JULIAN_OFFSET if d.isValid() else 0
+
+class ReviewRow:
+    """
+    One review_log.csv row as the app works with it, parsed once on load:
+    `files` is a tuple of FileRef and review dates are date ordinals (0 when
+    unset). Rows go back to CSV dicts only when saved (to_csv). `key` is
+    the row's identity in the LocalStore mirror ("" until it has one).
+    """
+    __slots__ = (*REVIEW_FIELDS, "key")
+
+    def __init__(self, topic, files=(), last_review=0, next_review=0,
+                 calendar_event_id="", drive_folder_id="", key=""):
+        self.topic = topic
+        self.files = tuple(files)
+        self.last_review = last_review
+        self.next_review = next_review
+        self.calendar_event_id = calendar_event_id
+        self.drive_folder_id = drive_folder_id
+        self.key = key
+
+    @classmethod
+    def from_csv(cls, r):
+        try:
+            files = [FileRef(f["id"], f["name"], f.get("link", "")) for f in json.loads(r.get("files") or "[]")]
+        except (ValueError, TypeError, KeyError):
+            print("Unreadable file list for topic", r.get("topic"))
+            files = []
+        return cls(
+            r.get("topic") or "", files,
+            date_ordinal(r.get("last_review") or ""), date_ordinal(r.get("next_review") or ""),
+            r.get("calendar_event_id") or "", r.get("drive_folder_id") or "", r.get("key") or "",
+        )
+
+    def to_csv(self):
+        return {
+            "topic": self.topic,
+            "files": json.dumps([f._asdict() for f in self.files]),
+            "last_review": ordinal_str(self.last_review),
+            "next_review": ordinal_str(self.next_review),
+            "calendar_event_id": self.calendar_event_id,
+            "drive_folder_id": self.drive_folder_id,
+            "key": self.key,
+        }
+
+# ─── LOCAL STORE ─────────────────────────────────────────────────────────
+class LocalStore:
+    """
+    SQLite mirror of review_log.csv.
+
+    Rows are keyed by row_key() (the Drive folder id, else the topic name),
+    so two topics sharing a name stay two rows. Writes touch only the rows
+    that differ and are recorded as row-level changes under a monotonically
+    increasing local version. The Drive copy is only
+    re-uploaded while that version is ahead of the last pushed one, and the
+    Drive file version seen at the last push/pull lets a restart reuse the
+    mirror instead of downloading the CSV again.
+
+    The `journal` table holds the other Drive/Calendar mutations (study-log
+    appends, calendar changes, deletes) until they have been sent. Commits
+    are fsync'd (synchronous=FULL), so nothing acknowledged in the UI is lost
+    to a crash or an offline session.
+
+    `log_rows` keeps the last study log read from Drive, and meta the
+    resolved Drive ids, so the next start can render without the network.
+    """
+    def __init__(self, path):
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA synchronous=FULL")
+        cols = ", ".join(f"{f} TEXT" for f in REVIEW_FIELDS)
+        log_cols = ", ".join(f"{f} TEXT" for f in LOG_FIELDS)
+        with self.db:
+            legacy = self._unkeyed()
+            self.db.executescript(f"""
+                CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, pos INTEGER, {cols});
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    version INTEGER, key TEXT, op TEXT
+                );
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT, key TEXT, payload TEXT
+                );
+                CREATE TABLE IF NOT EXISTS log_rows (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, {log_cols}
+                );
+            """)
+            if legacy is not None:
+                rows, pending = legacy
+                self._insert_all(rows)
+                by_topic = {r["topic"]: r["key"] for r in rows}
+                self.db.executemany(
+                    "INSERT INTO changes (version, key, op) VALUES (?, ?, ?)",
+                    [(v, by_topic.get(t, t), op) for v, t, op in pending]
+                )
+
+    def _unkeyed(self):
+        """
+        Rows and unpushed changes of a mirror from before rows had keys
+        (keyed by topic), dropping the old tables; None if already current.
+        """
+        cols = [r[1] for r in self.db.execute("PRAGMA table_info(rows)")]
+        if not cols or "key" in cols:
+            return None
+        cur = self.db.execute(f"SELECT {', '.join(REVIEW_FIELDS)} FROM rows ORDER BY pos")
+        rows = self._keyed([dict(zip(REVIEW_FIELDS, r)) for r in cur.fetchall()])
+        pushed = int(self._get("pushed_version", 0))
+        pending = self.db.execute(
+            "SELECT version, topic, op FROM changes WHERE version > ? ORDER BY seq", (pushed,)
+        ).fetchall()
+        self.db.execute("DROP TABLE rows")
+        self.db.execute("DROP TABLE changes")
+        return rows, pending
+
+    @staticmethod
+    def row_key(r):
+        """Identity of a row: its stored key, else its Drive folder, else its topic."""
+        return r.get("key") or r.get("drive_folder_id") or r.get("topic") or ""
+
+    def _keyed(self, rows):
+        """Copies of `rows` with a unique "key" (repeated folderless names get #2, #3, …)."""
+        out, seen = [], set()
+        for r in rows:
+            key = base = self.row_key(r)
+            n = 1
+            while key in seen:
+                n += 1
+                key = f"{base}#{n}"
+            seen.add(key)
+            out.append(dict(r, key=key))
+        return out
+
+    def _get(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            return self._get(key, default)
+
+    def set_meta(self, key, value):
+        with self.lock, self.db:
+            self._set(key, value)
+
+    @property
+    def version(self):
+        with self.lock:
+            return int(self._get("version", 0))
+
+    @property
+    def dirty(self):
+        with self.lock:
+            return int(self._get("version", 0)) > int(self._get("pushed_version", 0))
+
+    def is_current(self, file_id, remote_version):
+        """True if the mirror already holds the Drive file at `remote_version`."""
+        with self.lock:
+            return (
+                self._get("file_id") == file_id
+                and remote_version is not None
+                and self._get("remote_version") == str(remote_version)
+            )
+
+    def rows(self):
+        """Mirror rows in order, each with its "key"."""
+        with self.lock:
+            cur = self.db.execute(f"SELECT key, {', '.join(REVIEW_FIELDS)} FROM rows ORDER BY pos")
+            return [dict(zip(("key", *REVIEW_FIELDS), r)) for r in cur.fetchall()]
+
+    def _insert_all(self, rows):
+        """Replace the mirror with `rows` (which must carry unique keys)."""
+        self.db.execute("DELETE FROM rows")
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO rows (key, pos, {', '.join(REVIEW_FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(REVIEW_FIELDS))})",
+            [(r["key"], i, *(r.get(f) or "" for f in REVIEW_FIELDS)) for i, r in enumerate(rows)]
+        )
+
+    def reconcile(self, file_id, remote_rows, remote_version):
+        """
+        Adopt a freshly downloaded CSV. Local changes not yet pushed are
+        replayed on top of it so nothing edited offline is lost.
+        """
+        with self.lock, self.db:
+            merged = remote_rows = self._keyed(remote_rows)
+            if self._get("file_id") == file_id and self.dirty:
+                pending = self._pending()
+                local = {r["key"]: r for r in self.rows()}
+                # Only rows with unpushed edits win; the rest follow Drive
+                merged = [
+                    local[r["key"]] if r["key"] in pending and r["key"] in local else r
+                    for r in remote_rows if pending.get(r["key"]) != "delete"
+                ]
+                seen = {r["key"] for r in merged}
+                merged += [
+                    local[k] for k, op in pending.items()
+                    if op == "upsert" and k in local and k not in seen
+                ]
+            else:
+                self.db.execute("DELETE FROM changes")
+                self._set("pushed_version", self._get("version", 0))
+            self._insert_all(merged)
+            self._set("file_id", file_id)
+            self._set("remote_version", remote_version)
+        return self.rows()
+
+    def _pending(self):
+        cur = self.db.execute(
+            "SELECT key, op FROM changes WHERE version > ? ORDER BY seq",
+            (int(self._get("pushed_version", 0)),)
+        )
+        return dict(cur.fetchall())
+
+    @staticmethod
+    def _fields(r):
+        return {f: r.get(f) or "" for f in REVIEW_FIELDS}
+
+    def record(self, rows, base=None):
+        """
+        Make the mirror hold exactly `rows` (a full table, e.g. after a Drive
+        sync), writing only rows that differ; return the number changed.
+
+        With `base`, the table `rows` was derived from, only that difference
+        is applied: fields changed against `base` are written over the
+        current rows and rows dropped from `base` are removed, so rows
+        edited, added or removed in the meantime keep those edits.
+        """
+        with self.lock, self.db:
+            new = {r["key"]: self._fields(r) for r in self._keyed(rows)}
+            old = {r["key"]: self._fields(r) for r in self.rows()}
+            if base is not None:
+                was = {r["key"]: self._fields(r) for r in self._keyed(base)}
+                changed = []
+                for k, r in new.items():
+                    if k in was:
+                        if k not in old:
+                            continue
+                        r = dict(old[k], **{f: v for f, v in r.items() if was[k][f] != v})
+                    if old.get(k) != r:
+                        changed.append((k, r))
+                return self._write(changed, [k for k in was if k not in new and k in old])
+            changed = [(k, r) for k, r in new.items() if old.get(k) != r]
+            removed = [k for k in old if k not in new]
+            # Keep the on-disk order in step with the caller's
+            self.db.executemany("UPDATE rows SET pos=? WHERE key=?", [(i, k) for i, k in enumerate(new)])
+            return self._write(changed, removed)
+
+    def upsert(self, rows):
+        """Write just these rows (new ones go last); return the number changed."""
+        with self.lock, self.db:
+            changed = []
+            for r in rows:
+                key, new = self.row_key(r), self._fields(r)
+                cur = self.db.execute(
+                    f"SELECT {', '.join(REVIEW_FIELDS)} FROM rows WHERE key=?", (key,)
+                ).fetchone()
+                if cur is None or dict(zip(REVIEW_FIELDS, cur)) != new:
+                    changed.append((key, new))
+            return self._write(changed, [])
+
+    def remove(self, keys):
+        """Drop the rows with these keys; return the number removed."""
+        with self.lock, self.db:
+            found = [k for k in keys if self.db.execute("SELECT 1 FROM rows WHERE key=?", (k,)).fetchone()]
+            return self._write([], found)
+
+    def _write(self, changed, removed):
+        if not changed and not removed:
+            return 0
+        version = int(self._get("version", 0)) + 1
+        self.db.executemany(
+            "INSERT INTO changes (version, key, op) VALUES (?, ?, ?)",
+            [(version, k, "upsert") for k, _ in changed] + [(version, k, "delete") for k in removed]
+        )
+        end = self.db.execute("SELECT COALESCE(MAX(pos), -1) FROM rows").fetchone()[0]
+        for key, r in changed:
+            row = self.db.execute("SELECT pos FROM rows WHERE key=?", (key,)).fetchone()
+            if row:
+                pos = row[0]
+            else:
+                end += 1
+                pos = end
+            self.db.execute(
+                f"INSERT OR REPLACE INTO rows (key, pos, {', '.join(REVIEW_FIELDS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(REVIEW_FIELDS))})",
+                (key, pos, *(r[f] for f in REVIEW_FIELDS))
+            )
+        self.db.executemany("DELETE FROM rows WHERE key=?", [(k,) for k in removed])
+        self._set("version", version)
+        return len(changed) + len(removed)
+
+    def snapshot(self):
+        """Return (version, rows) to push, or (None, None) if nothing is dirty."""
+        with self.lock:
+            if not self.dirty:
+                return None, None
+            return self.version, self.rows()
+
+    def log_rows(self):
+        """Study log as last seen on Drive, oldest first."""
+        with self.lock:
+            cur = self.db.execute(f"SELECT {', '.join(LOG_FIELDS)} FROM log_rows ORDER BY seq")
+            return [dict(zip(LOG_FIELDS, r)) for r in cur.fetchall()]
+
+    def save_log(self, rows, append=False):
+        with self.lock, self.db:
+            if not append:
+                self.db.execute("DELETE FROM log_rows")
+            self.db.executemany(
+                f"INSERT INTO log_rows ({', '.join(LOG_FIELDS)}) VALUES ({', '.join('?' * len(LOG_FIELDS))})",
+                [tuple(r.get(f) or "" for f in LOG_FIELDS) for r in rows]
+            )
+
+    def enqueue(self, kind, key, payload, supersede=False):
+        """
+        Journal a mutation and return its seq. With `supersede`, earlier
+        unsent ops of the same kind and key are dropped (only the latest
+        calendar state matters).
+        """
+        with self.lock, self.db:
+            if supersede:
+                self.db.execute("DELETE FROM journal WHERE kind=? AND key=?", (kind, key))
+            return self.db.execute(
+                "INSERT INTO journal (kind, key, payload) VALUES (?, ?, ?)",
+                (kind, key, json.dumps(payload))
+            ).lastrowid
+
+    def journal_seq(self):
+        """Seq of the latest op ever journaled (sent or not)."""
+        with self.lock:
+            row = self.db.execute("SELECT seq FROM sqlite_sequence WHERE name='journal'").fetchone()
+            return row[0] if row else 0
+
+    def journal(self):
+        """Unsent ops, oldest first, as (seq, kind, key, payload)."""
+        with self.lock:
+            cur = self.db.execute("SELECT seq, kind, key, payload FROM journal ORDER BY seq")
+            return [(seq, kind, key, json.loads(p)) for seq, kind, key, p in cur.fetchall()]
+
+    def journal_done(self, seqs):
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM journal WHERE seq=?", [(s,) for s in seqs])
+
+    @property
+    def pending(self):
+        """True while the CSV or any journaled op still has to reach Google."""
+        with self.lock:
+            return self.dirty or self.db.execute("SELECT 1 FROM journal LIMIT 1").fetchone() is not None
+
+    def pending_logs(self, upto=None):
+        """Study-log entries journaled but not yet uploaded (up to seq `upto`)."""
+        return [p for seq, kind, _, p in self.journal()
+                if kind == "log" and (upto is None or seq <= upto)]
+
+    def mark_pushed(self, version, remote_version):
+        with self.lock, self.db:
+            self._set("pushed_version", max(version, int(self._get("pushed_version", 0))))
+            self._set("remote_version", remote_version)
+            self.db.execute("DELETE FROM changes WHERE version <= ?", (version,))
+
+# ─── TRANSPORT ───────────────────────────────────────────────────────────
+class AuthorizedTransport:
+    """
+    Authorized Google API clients for one set of credentials, one per thread.
+
+    httplib2.Http is not thread-safe, so each thread gets its own
+    AuthorizedHttp (certificates validated) and its own service objects on
+    top of it. The Http lives as long as the thread, so its keep-alive
+    connections are reused rather than re-handshaking TLS on every call.
+    Tokens are refreshed under a lock TOKEN_REFRESH_MARGIN before expiry,
+    so parallel workers never race to refresh or send a token that lapses
+    mid-request.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def for_credentials(cls, creds):
+        """The transport shared by every client of `creds`."""
+        with cls._shared_lock:
+            transport = cls._shared.get(id(creds))
+            if transport is None or transport.creds is not creds:
+                transport = cls._shared[id(creds)] = cls(creds)
+            return transport
+
+    def __init__(self, creds):
+        self.creds = creds
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def http(self):
+        """The calling thread's AuthorizedHttp, with a token good for a while."""
+        auth_http = getattr(self.local, "http", None)
+        if auth_http is None:
+            auth_http = self.local.http = google_auth_httplib2.AuthorizedHttp(
+                self.creds, http=httplib2.Http(timeout=HTTP_TIMEOUT)
+            )
+            self.local.services = {}
+        if self._expiring():
+            with self.lock:
+                if self._expiring():   # another thread may have refreshed meanwhile
+                    self.creds.refresh(google_auth_httplib2.Request(auth_http.http))
+        return auth_http
+
+    def service(self, api, version):
+        """The calling thread's discovery client for `api`."""
+        auth_http = self.http()
+        svc = self.local.services.get(api)
+        if svc is None:
+            svc = self.local.services[api] = STARTUP.timed(
+                "service build", discovery.build, api, version, http=auth_http, cache_discovery=False
+            )
+        return svc
+
+    def _expiring(self):
+        if not self.creds.token:
+            return True
+        expiry = self.creds.expiry   # naive UTC, as google-auth stores it
+        return expiry is not None and expiry - datetime.utcnow() < timedelta(seconds=TOKEN_REFRESH_MARGIN)
+
 # ─── DRIVE UPLOADER ─────────────────────────────────────────────────────
 class DriveUploader:
     def __init__(self, creds, root_folder_id):
-        raw_http = httplib2.Http()
-        auth_http = google_auth_httplib2.AuthorizedHttp(creds, http=raw_http)
-        self.drive = build("drive", "v3", http=auth_http, cache_discovery=False)
+        self.transport = AuthorizedTransport.for_credentials(creds)
         self.root_id = root_folder_id
-        self.records_id = self._get_or_create_folder(RECORDS_FOLDER_NAME, root_folder_id)
+        self.store = LocalStore(LOCAL_DB)
+        self.log_lock = threading.Lock()
+        self.log_segments = {}   # segment name -> Drive file id
+        # Segment reads share long-lived threads, so their clients are reused
+        self.executor = ThreadPoolExecutor(max_workers=LOG_FETCH_WORKERS, thread_name_prefix="drive-log")
+        # Ids resolved on an earlier run avoid three lookups before the window opens
+        ids = [self.store.get_meta(k) for k in self.RESOLVED]
+        if all(ids):
+            self.records_id, self.csv_id, self.log_id = ids
+        else:
+            self.resolve()
+
+    RESOLVED = ("records_id", "csv_id", "log_id")
+
+    @property
+    def drive(self):
+        """Drive client of the calling thread, built on its first use."""
+        return self.transport.service("drive", "v3")
+
+    def resolve(self):
+        """Look up (or create) records/ and its CSVs; remember the ids locally."""
+        self.records_id = self._get_or_create_folder(RECORDS_FOLDER_NAME, self.root_id)
         self.csv_id = self._get_or_create_file(CSV_FILENAME, REVIEW_FIELDS, prepopulate=True)
         self.log_id = self._get_or_create_file(STUDY_LOG_FILENAME, LOG_FIELDS, prepopulate=False)
+        for key in self.RESOLVED:
+            self.store.set_meta(key, getattr(self, key))
 
     def _get_or_create_folder(self, name, parent_id):
         q = (
@@ -101,9 +798,11 @@ class DriveUploader:
         writer = csv.DictWriter(buf, fieldnames=fields)
         writer.writeheader()
         if prepopulate and name == CSV_FILENAME:
-            for fld in self.list_topic_folders():
+            folders = self.list_topic_folders()
+            index = self.list_files_in_folders(f["id"] for f in folders)
+            for fld in folders:
                 files_meta = []
-                for f in self.list_files_in_folder(fld["id"]):
+                for f in index[fld["id"]]:
                     files_meta.append({
                         "id": f["id"],
                         "name": f["name"],
@@ -118,37 +817,149 @@ class DriveUploader:
                     "drive_folder_id": fld["id"],
                 })
 
-        media = MediaIoBaseUpload(io.BytesIO(buf.getvalue().encode()), mimetype="text/csv")
+        media = gapi_http.MediaIoBaseUpload(io.BytesIO(buf.getvalue().encode()), mimetype="text/csv")
         meta = {"name": name, "parents": [self.records_id], "mimeType": "text/csv"}
         newf = self.drive.files().create(body=meta, media_body=media, fields="id").execute()
         return newf["id"]
 
+    def iter_files(self, q, fields="id,name"):
+        """Yield every file matching `q`, following nextPageToken."""
+        token = None
+        while True:
+            resp = self.drive.files().list(
+                q=q, pageSize=LIST_PAGE_SIZE, pageToken=token,
+                fields=f"nextPageToken, files({fields})"
+            ).execute()
+            yield from resp.get("files", [])
+            token = resp.get("nextPageToken")
+            if not token:
+                return
+
     def list_topic_folders(self):
         q = (
             f"'{self.root_id}' in parents and "
             "mimeType='application/vnd.google-apps.folder' and name!='records' and trashed=false"
         )
-        files = self.drive.files().list(q=q, fields="files(id,name)").execute()
-        return files.get("files", [])
+        return list(self.iter_files(q))
 
-    def list_files_in_folder(self, folder_id):
-        q = f"'{folder_id}' in parents and trashed=false"
-        resp = self.drive.files().list(q=q, fields="files(id,name)").execute()
-        return resp.get("files", [])
+    def list_files_in_folders(self, folder_ids):
+        """
+        Return {folder_id: [files]} for many folders at once, querying
+        LIST_FOLDERS_PER_QUERY parents per request instead of one per folder.
+        """
+        folder_ids = list(folder_ids)
+        index = {fid: [] for fid in folder_ids}
+        for i in range(0, len(folder_ids), LIST_FOLDERS_PER_QUERY):
+            chunk = folder_ids[i:i + LIST_FOLDERS_PER_QUERY]
+            parents = " or ".join(f"'{fid}' in parents" for fid in chunk)
+            for f in self.iter_files(f"({parents}) and trashed=false", fields=f"{FILE_META_FIELDS},parents"):
+                for p in f.get("parents", []):
+                    if p in index:
+                        index[p].append(f)
+        return index
+
+    def get_changes_token(self):
+        return self.drive.changes().getStartPageToken().execute()["startPageToken"]
+
+    def list_changes(self, token):
+        """Return (changes, new_token) for everything changed since `token`."""
+        changes = []
+        while True:
+            resp = self.drive.changes().list(
+                pageToken=token, pageSize=LIST_PAGE_SIZE, spaces="drive", includeRemoved=True,
+                fields=(
+                    "nextPageToken, newStartPageToken, "
+                    f"changes(fileId,removed,file({FILE_META_FIELDS},mimeType,parents,trashed))"
+                )
+            ).execute()
+            changes += resp.get("changes", [])
+            if "newStartPageToken" in resp:
+                return changes, resp["newStartPageToken"]
+            token = resp["nextPageToken"]
 
     def read_csv(self):
-        return self._read_file(self.csv_id)
+        # A metadata round-trip is enough when the mirror is already current
+        remote = self._remote_version(self.csv_id)
+        if self.store.is_current(self.csv_id, remote):
+            return self.store.rows()
+        return self.store.reconcile(self.csv_id, self._read_file(self.csv_id), remote)
+
+    def write_csv(self, rows, base=None):
+        """Record `rows` in the local mirror (see LocalStore.record); flush_csv() pushes them to Drive."""
+        return self.store.record(rows, base)
+
+    def flush_csv(self):
+        """Upload the mirror as one CSV snapshot if it has unpushed changes."""
+        version, rows = self.store.snapshot()
+        if version is None:
+            return False
+        remote = self._write_file(self.csv_id, REVIEW_FIELDS, rows)
+        self.store.mark_pushed(version, remote)
+        return True
 
-    def write_csv(self, rows):
-        self._write_file(self.csv_id, REVIEW_FIELDS, rows)
+    def _remote_version(self, file_id):
+        return self.drive.files().get(fileId=file_id, fields="version").execute().get("version")
 
     def read_log(self):
-        return self._read_file(self.log_id)
+        """Legacy study_log.csv followed by every monthly segment, oldest first."""
+        segs = self._list_log_segments()
+        names = sorted(segs)
+
+        def fetch(file_id):
+            return self._read_file(file_id)
+
+        parts = list(self.executor.map(fetch, [self.log_id] + [segs[n] for n in names]))
+
+        with self.log_lock:
+            self.log_segments = segs
+        rows = [row for part in parts for row in part]
+        self.store.save_log(rows)
+        return rows
+
+    def write_log(self, rows):
+        """
+        Rewrite the whole study log (used when pruning). Entries are regrouped
+        into monthly segments and the legacy file is left with just its header.
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(self._segment_name(row.get("review_date", "")), []).append(row)
+        with self.log_lock:
+            segs = self._list_log_segments()
+            for name in set(segs) | set(groups):
+                seg_rows = groups.get(name, [])
+                if name in segs:
+                    self._write_file(segs[name], LOG_FIELDS, seg_rows)
+                else:
+                    segs[name] = self._create_segment(name, seg_rows)
+            self._write_file(self.log_id, LOG_FIELDS, [])
+            self.log_segments = segs
+        self.store.save_log(rows)
+
+    @staticmethod
+    def _segment_name(review_date):
+        month = review_date[:7]
+        if not re.fullmatch(r"\d{4}-\d{2}", month):
+            month = datetime.utcnow().strftime("%Y-%m")
+        return f"{LOG_SEGMENT_PREFIX}{month}.csv"
+
+    def _list_log_segments(self):
+        q = f"'{self.records_id}' in parents and name contains '{LOG_SEGMENT_PREFIX}' and trashed=false"
+        return {f["name"]: f["id"] for f in self.iter_files(q) if f["name"].startswith(LOG_SEGMENT_PREFIX)}
+
+    def _create_segment(self, name, rows):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=LOG_FIELDS)
+        writer.writeheader()
+        writer.writerows([{k: v for k, v in row.items() if k in LOG_FIELDS} for row in rows])
+        media = gapi_http.MediaIoBaseUpload(io.BytesIO(buf.getvalue().encode()), mimetype="text/csv")
+        meta = {"name": name, "parents": [self.records_id], "mimeType": "text/csv"}
+        return self.drive.files().create(body=meta, media_body=media, fields="id").execute()["id"]
 
-    def _read_file(self, file_id):
-        req = self.drive.files().get_media(fileId=file_id)
+    def _read_file(self, file_id, drive=None):
+        req = (drive or self.drive).files().get_media(fileId=file_id)
         buf = io.BytesIO()
-        downloader = MediaIoBaseDownload(buf, req)
+        downloader = gapi_http.MediaIoBaseDownload(buf, req)
         done = False
         while not done:
             _, done = downloader.next_chunk()
@@ -161,19 +972,35 @@ class DriveUploader:
         writer.writeheader()
         filtered = [{k: v for k, v in row.items() if k in fields} for row in rows]
         writer.writerows(filtered)
-        media = MediaIoBaseUpload(io.BytesIO(buf.getvalue().encode()), mimetype="text/csv")
-        self.drive.files().update(fileId=file_id, media_body=media).execute()
+        media = gapi_http.MediaIoBaseUpload(io.BytesIO(buf.getvalue().encode()), mimetype="text/csv")
+        resp = self.drive.files().update(fileId=file_id, media_body=media, fields="version").execute()
+        return resp.get("version")
 
-    def append_log(self, entry):
-        logs = self.read_log()
-        logs.append(entry)
-        self._write_file(self.log_id, LOG_FIELDS, logs)
+    def append_logs(self, entries):
+        """
+        Append entries with one upload per monthly segment they touch. The
+        segment is re-read first (it holds one month, so it is small), so
+        entries another device added since our last read are kept.
+        """
+        groups = {}
+        for entry in entries:
+            groups.setdefault(self._segment_name(entry.get("review_date", "")), []).append(entry)
+        with self.log_lock:
+            for name, new in groups.items():
+                if name not in self.log_segments:
+                    self.log_segments = self._list_log_segments()
+                seg_id = self.log_segments.get(name)
+                if seg_id is None:
+                    self.log_segments[name] = self._create_segment(name, new)
+                    continue
+                self._write_file(seg_id, LOG_FIELDS, self._read_file(seg_id) + new)
+        self.store.save_log(entries, append=True)
 
     def create_topic_folder(self, name):
         return self._get_or_create_folder(name, self.root_id)
 
     def upload_file(self, path, folder_id):
-        media = MediaFileUpload(path, resumable=True)
+        media = gapi_http.MediaFileUpload(path, resumable=True)
         meta = {"name": Path(path).name, "parents": [folder_id]}
         info = self.drive.files().create(body=meta, media_body=media, fields="id,name").execute()
         link = f"https://drive.google.com/uc?export=download&id={info['id']}"
@@ -188,100 +1015,964 @@ class DriveUploader:
         except Exception:
             pass
 
-    def download_file_to_path(self, file_id: str, dest_path: str):
+    def get_file_meta(self, file_id, drive=None):
+        return (drive or self.drive).files().get(fileId=file_id, fields=FILE_META_FIELDS).execute()
+
+    def get_files_meta(self, file_ids):
+        """{file_id: metadata} for many files, batched; files Drive can't find are left out."""
+        metas = {}
+
+        def on_reply(request_id, response, exception):
+            if exception is None:
+                metas[request_id] = response
+
+        ids = list(file_ids)
+        for i in range(0, len(ids), DRIVE_BATCH_SIZE):
+            batch = self.drive.new_batch_http_request(callback=on_reply)
+            for file_id in ids[i:i + DRIVE_BATCH_SIZE]:
+                batch.add(self.drive.files().get(fileId=file_id, fields=FILE_META_FIELDS),
+                          request_id=file_id)
+            batch.execute()
+        return metas
+
+    def fetch_range(self, file_id, start, end, drive=None):
+        """Bytes [start, end) of a Drive file, via a ranged get_media."""
+        req = (drive or self.drive).files().get_media(fileId=file_id)
+        req.headers["Range"] = f"bytes={start}-{end - 1}"
+        return req.execute()
+
+    def fetch_to_path(self, file_id, dest_path, drive=None,
+                      chunk_size=DOWNLOAD_CHUNK_SIZE, on_chunk=None):
+        """
+        Stream a Drive file into `dest_path` and return its md5 hex digest.
+        Bytes go to a .part file that is renamed into place only once
+        complete, so an interrupted download never looks like a cached file.
+        `on_chunk(nbytes)` reports progress.
+        """
         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = dest_path + ".part"
+        req = (drive or self.drive).files().get_media(fileId=file_id)
         try:
-            req = self.drive.files().get_media(fileId=file_id)
-            with open(dest_path, "wb") as fh:
-                downloader = MediaIoBaseDownload(fh, req)
-                done = False
+            with open(tmp_path, "wb") as fh:
+                sink = _HashingWriter(fh)
+                downloader = gapi_http.MediaIoBaseDownload(sink, req, chunksize=chunk_size)
+                done, seen = False, 0
                 while not done:
-                    _, done = downloader.next_chunk()
-        except errors.HttpError as e:
-            if e.resp.status != 404:
-                raise
+                    status, done = downloader.next_chunk()
+                    now = status.resumable_progress if status else seen
+                    if on_chunk and now > seen:
+                        on_chunk(now - seen)
+                    seen = now
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return sink.md5.hexdigest()
+
+class _HashingWriter:
+    """File wrapper that hashes everything MediaIoBaseDownload writes."""
+    def __init__(self, fh):
+        self.fh = fh
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.md5.update(data)
+        return self.fh.write(data)
+
+# ─── DOWNLOADS ────────────────────────────────────────────────────────────
+def file_md5(path):
+    h = hashlib.md5()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class CacheManifest:
+    """
+    Record of what local_records/ holds: file id -> md5, size, Drive
+    modifiedTime and local path. A cached copy is trusted only if it is
+    recorded here and still has the recorded size, so revalidating is a
+    metadata comparison; half-written or replaced files are refetched and
+    renamed ones are moved instead of downloaded again.
+    """
+    def __init__(self, path=CACHE_MANIFEST):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of the file at a time
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        self.entries = data.get("files", {})
+        self.evicted = set(data.get("evicted", []))
+
+    def save(self):
+        # Saves come from download workers and the GUI at once; the snapshot
+        # is taken inside the save lock so a newer one is never overwritten
+        with self._save_lock:
+            with self.lock:
+                data = json.dumps({"files": self.entries, "evicted": sorted(self.evicted)})
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(data)
+            os.replace(tmp, self.path)
+
+    def get(self, file_id):
+        with self.lock:
+            return self.entries.get(file_id)
+
+    def check(self, file_id, dest, meta=None):
+        """
+        Compare the cached copy of `file_id` against Drive metadata `meta`
+        (or just the recorded state when `meta` is None). Returns "ok",
+        "move" (same content cached under another path) or "fetch".
+        """
+        ent = self.get(file_id)
+        if ent is None:
+            return "fetch"
+        if meta:
+            if meta.get("md5Checksum") and meta["md5Checksum"] != ent["md5"]:
+                return "fetch"
+            if meta.get("size") and int(meta["size"]) != ent["size"]:
+                return "fetch"
+        cached = Path(ent["path"])
+        try:
+            if cached.stat().st_size != ent["size"]:
+                return "fetch"
+        except OSError:
+            return "fetch"
+        return "ok" if cached == Path(dest) else "move"
+
+    def record(self, file_id, dest, md5, meta=None):
+        meta = meta or {}
+        with self.lock:
+            self.entries[file_id] = {
+                "md5": md5,
+                "size": Path(dest).stat().st_size,
+                "modified": meta.get("modifiedTime", ""),
+                "path": Path(dest).as_posix(),
+                "atime": time.time(),
+            }
+            self.evicted.discard(file_id)
+
+    def touch(self, file_id):
+        with self.lock:
+            if file_id in self.entries:
+                self.entries[file_id]["atime"] = time.time()
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(e["size"] for e in self.entries.values())
+
+    def adopt(self, file_id, dest, meta):
+        """Record an untracked local file if it matches Drive's checksum."""
+        md5 = file_md5(dest)
+        if meta.get("md5Checksum") != md5:
+            return False
+        self.record(file_id, dest, md5, meta)
+        return True
+
+    def move(self, file_id, dest):
+        with self.lock:
+            ent = self.entries[file_id]
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(ent["path"], dest)
+            ent["path"] = Path(dest).as_posix()
+
+    def forget(self, file_id):
+        with self.lock:
+            self.entries.pop(file_id, None)
+
+    def forget_under(self, folder):
+        prefix = Path(folder).as_posix() + "/"
+        with self.lock:
+            for fid in [k for k, e in self.entries.items() if e["path"].startswith(prefix)]:
+                del self.entries[fid]
+
+    def rebase(self, old_folder, new_folder):
+        """Follow a renamed topic directory."""
+        old, new = Path(old_folder).as_posix() + "/", Path(new_folder).as_posix() + "/"
+        with self.lock:
+            for ent in self.entries.values():
+                if ent["path"].startswith(old):
+                    ent["path"] = new + ent["path"][len(old):]
+
+class CachePolicy:
+    """
+    Keeps local_records/ under a byte budget.
+
+    Opening a file marks it as used. When the cache is over budget the least
+    recently used PDFs are deleted, except those in `protected` (topics due
+    soon). Evicted files are left out of the background mirror and are only
+    fetched again when opened.
+    """
+    def __init__(self, manifest, budget_bytes):
+        self.manifest = manifest
+        self.budget = budget_bytes
+
+    def touch(self, file_id):
+        self.manifest.touch(file_id)
+
+    def select(self, jobs, protected):
+        """
+        Pick which mirror jobs to download without overrunning the budget.
+        Jobs need their Drive metadata (see DownloadEngine.sized); without a
+        size a file would slip past the budget.
+        """
+        m = self.manifest
+        used = m.total_bytes()
+        out = []
+        for job in sorted(jobs, key=lambda j: j[0] not in protected):
+            file_id, _, meta = job
+            size = int((meta or {}).get("size") or 0)
+            entry = m.get(file_id)
+            if entry is not None:
+                # total_bytes() already counts the copy being replaced
+                size -= entry["size"]
+            if file_id in protected or entry is not None:
+                out.append(job)
+            elif file_id in m.evicted:
+                continue
+            elif used + size > self.budget:
+                with m.lock:
+                    m.evicted.add(file_id)
+                continue
+            else:
+                out.append(job)
+            used += size
+        return out
+
+    def enforce(self, protected=()):
+        """Evict least recently used files until the cache fits the budget."""
+        m = self.manifest
+        total = m.total_bytes()
+        if total <= self.budget:
+            return
+        with m.lock:
+            lru = sorted(m.entries.items(), key=lambda kv: kv[1].get("atime", 0))
+        for file_id, ent in lru:
+            if total <= self.budget:
+                break
+            if file_id in protected:
+                continue
+            Path(ent["path"]).unlink(missing_ok=True)
+            m.forget(file_id)
+            with m.lock:
+                m.evicted.add(file_id)
+            total -= ent["size"]
+        m.save()
+
+class DownloadEngine:
+    """
+    Downloads many Drive files concurrently into local_records/.
+
+    Each worker thread uses its own Drive client (see AuthorizedTransport)
+    and writes through DriveUploader.fetch_to_path, so
+    files appear atomically. Every job is first revalidated against the
+    CacheManifest, and only content that actually changed is downloaded.
+    """
+    def __init__(self, uploader, manifest, workers=DOWNLOAD_WORKERS, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        self.uploader = uploader
+        self.manifest = manifest
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # Long-lived, so each worker's Drive client and connection is reused
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download")
+        self.closed = False
+
+    def close(self):
+        """Drop queued downloads; running ones stop at their next chunk."""
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _file_lock(self, file_id):
+        # Serialises concurrent fetches of one file (prefetch vs. open)
+        with self._locks_guard:
+            return self._locks.setdefault(file_id, threading.Lock())
+
+    def pending(self, jobs):
+        """
+        Drop jobs whose cached copy is current and move renamed files into
+        place; return the jobs that still need Drive.
+        """
+        todo, moved = [], False
+        for file_id, dest, meta in jobs:
+            state = self.manifest.check(file_id, dest, meta)
+            if state == "move":
+                self.manifest.move(file_id, dest)
+                moved = True
+            elif state == "fetch":
+                todo.append((file_id, dest, meta))
+        if moved:
+            self.manifest.save()
+        return todo
+
+    def sized(self, jobs):
+        """Fill in the Drive metadata (and so the size) of jobs that lack it."""
+        unknown = [file_id for file_id, _, meta in jobs if meta is None]
+        if not unknown:
+            return jobs
+        metas = self.uploader.get_files_meta(unknown)
+        return [(file_id, dest, meta if meta is not None else metas.get(file_id))
+                for file_id, dest, meta in jobs]
+
+    def run(self, jobs, progress=None):
+        """
+        Bring `jobs`, an iterable of (file_id, dest_path, drive_meta_or_None),
+        into the cache.
+
+        `progress`, if given, is called from worker threads with a dict of
+        files_done/files_total/bytes_done/bytes_total/rate (bytes per second).
+        Returns the ids of files that no longer exist on Drive.
+        """
+        jobs = self.pending(jobs)
+        if not jobs:
+            return []
+        state = {
+            "files_done": 0, "files_total": len(jobs),
+            "bytes_done": 0, "bytes_total": sum(int((j[2] or {}).get("size") or 0) for j in jobs),
+            "rate": 0.0,
+        }
+        lock = threading.Lock()
+        start = time.monotonic()
+        missing = []
+
+        def report(nbytes, nfiles):
+            if self.closed:
+                raise CancelledError("download engine closed")
+            with lock:
+                state["bytes_done"] += nbytes
+                state["files_done"] += nfiles
+                state["rate"] = state["bytes_done"] / max(time.monotonic() - start, 1e-6)
+                snap = dict(state)
+            if progress:
+                progress(snap)
+
+        def fetch(job):
+            with self._file_lock(job[0]):
+                if self.manifest.check(*job) == "ok":
+                    report(0, 1)
+                    return
+                fetch_locked(job)
+
+        def fetch_locked(job):
+            file_id, dest, meta = job
+            drive = self.uploader.drive
+            try:
+                if os.path.exists(dest):
+                    # Untracked copy (e.g. from before the manifest): keep it
+                    # if Drive's checksum says it is current
+                    meta = meta or self.uploader.get_file_meta(file_id, drive)
+                    if self.manifest.adopt(file_id, dest, meta):
+                        report(0, 1)
+                        return
+                md5 = self.uploader.fetch_to_path(
+                    file_id, dest, drive=drive,
+                    chunk_size=self.chunk_size, on_chunk=lambda n: report(n, 0)
+                )
+                if meta and meta.get("md5Checksum") not in (None, md5):
+                    Path(dest).unlink(missing_ok=True)
+                    raise IOError(f"Checksum mismatch downloading {dest}")
+                self.manifest.record(file_id, dest, md5, meta)
+            except errors.HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                with lock:
+                    missing.append(file_id)
+                self.manifest.forget(file_id)
+            report(0, 1)
+
+        try:
+            if len(jobs) == 1:
+                # Prefetch and open: the calling pool thread has a client already
+                fetch(jobs[0])
+            else:
+                for _ in self.executor.map(fetch, jobs):
+                    pass
+        finally:
+            self.manifest.save()
+        return missing
+
+class StreamCache:
+    """
+    Files the viewer is reading while they download. Each one lives in a
+    sparse <dest>.stream file with a bitmap of which STREAM_CHUNK_SIZE pieces
+    hold real data; `read` fetches only the missing pieces of a range. Once
+    every piece is present the file is checksummed and promoted into the
+    cache exactly like a finished DownloadEngine job.
+    """
+    def __init__(self, uploader, manifest, chunk_size=STREAM_CHUNK_SIZE):
+        self.uploader = uploader
+        self.manifest = manifest
+        self.chunk_size = chunk_size
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def open(self, file_id, dest):
+        """Start (or keep) a stream of `file_id` into `dest`; returns its size."""
+        meta = self.uploader.get_file_meta(file_id, self.uploader.drive)
+        size = int(meta.get("size") or 0)
+        with self._lock:
+            st = self._streams.get(file_id)
+            if st and st["dest"] == dest and st["meta"].get("md5Checksum") == meta.get("md5Checksum"):
+                return size
+            tmp = dest + ".stream"
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(tmp, "wb") as fh:
+                fh.truncate(size)
+            chunks = -(-size // self.chunk_size)
+            self._streams[file_id] = {
+                "dest": dest, "path": tmp, "meta": meta, "size": size,
+                "have": bytearray(chunks), "left": chunks, "lock": threading.Lock(),
+            }
+        return size
+
+    def pending(self, dest):
+        """(file_id, size) of an unfinished stream into `dest`, else None."""
+        with self._lock:
+            for file_id, st in self._streams.items():
+                if st["dest"] == dest and st["left"]:
+                    return file_id, st["size"]
+        return None
+
+    def read(self, file_id, start, end):
+        """Bytes [start, end) of a streamed file, fetching missing chunks."""
+        with self._lock:
+            st = self._streams[file_id]
+        end = min(end, st["size"])
+        if end <= start:
+            return b""
+        cs = self.chunk_size
+        with st["lock"]:
+            missing = [i for i in range(start // cs, (end - 1) // cs + 1) if not st["have"][i]]
+
+        # One ranged request per run of consecutive missing chunks
+        runs = []
+        for i in missing:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        drive = self.uploader.drive
+        for first, last in runs:
+            lo, hi = first * cs, min((last + 1) * cs, st["size"])
+            data = self.uploader.fetch_range(file_id, lo, hi, drive)
+            with st["lock"]:
+                if not st["left"]:
+                    continue
+                with open(st["path"], "r+b") as fh:
+                    fh.seek(lo)
+                    fh.write(data)
+                for i in range(first, last + 1):
+                    if not st["have"][i]:
+                        st["have"][i] = 1
+                        st["left"] -= 1
+                if not st["left"]:
+                    self._promote(file_id, st)
+
+        with st["lock"]:
+            with open(st["path"], "rb") as fh:
+                fh.seek(start)
+                return fh.read(end - start)
+
+    def _promote(self, file_id, st):
+        # Caller holds st["lock"]
+        md5 = file_md5(st["path"])
+        expected = st["meta"].get("md5Checksum")
+        if expected and md5 != expected:
+            print("Checksum mismatch streaming", st["dest"], "- refetching")
+            st["have"] = bytearray(len(st["have"]))
+            st["left"] = len(st["have"])
+            return
+        os.replace(st["path"], st["dest"])
+        st["path"] = st["dest"]
+        self.manifest.record(file_id, st["dest"], md5, st["meta"])
+        self.manifest.save()
+
+    def discard(self):
+        """Drop unfinished streams (their .stream files are useless later)."""
+        with self._lock:
+            streams, self._streams = self._streams, {}
+        for st in streams.values():
+            if st["left"]:
+                Path(st["path"]).unlink(missing_ok=True)
 
 # ─── CALENDAR MANAGER ─────────────────────────────────────────────────────
 class CalendarManager:
     def __init__(self, creds, calendar_id):
-        raw_http = httplib2.Http(disable_ssl_certificate_validation=True)
-        auth_http = google_auth_httplib2.AuthorizedHttp(creds, http=raw_http)
-        self.cal = build("calendar", "v3", http=auth_http, cache_discovery=False)
+        self.transport = AuthorizedTransport.for_credentials(creds)
         self.cal_id = calendar_id
+        # One listing-and-write pass at a time: two overlapping passes each
+        # see the other's topics as missing and insert duplicate events
+        self.lock = threading.Lock()
+
+    @property
+    def cal(self):
+        """Calendar client of the calling thread, built on its first use."""
+        return self.transport.service("calendar", "v3")
+
+    @staticmethod
+    def topic_key(ent):
+        """Stable id stored on each event; survives topic renames."""
+        return ent.drive_folder_id or ent.topic
 
-    def create_event(self, topic, date_str):
+    def _event_body(self, topic, date_str, topic_id=None):
         try:
             dt1 = datetime.strptime(date_str, "%Y-%m-%d").date()
             start_dt = datetime.combine(dt1, datetime.min.time()) + timedelta(hours=9)
             end_dt = start_dt + timedelta(minutes=30)
         except Exception:
             return None
+        return {
+            "summary": f"Review: {topic}",
+            "description": f"Scheduled review for topic '{topic}'",
+            "start": {"dateTime": start_dt.isoformat(), "timeZone": "Europe/Rome"},
+            "end":   {"dateTime": end_dt.isoformat(),   "timeZone": "Europe/Rome"},
+            "attendees": [{"email": USER_EMAIL}],
+            "reminders": {"useDefault": False, "overrides": [{"method": "email", "minutes": 0}]},
+            "extendedProperties": {"private": {CAL_TOPIC_PROPERTY: topic_id or topic}},
+        }
 
-        event = self.cal.events().insert(
-            calendarId=self.cal_id,
-            body={
-                "summary": f"Review: {topic}",
-                "description": f"Scheduled review for topic '{topic}'",
-                "start": {"dateTime": start_dt.isoformat(), "timeZone": "Europe/Rome"},
-                "end":   {"dateTime": end_dt.isoformat(),   "timeZone": "Europe/Rome"},
-                "attendees": [{"email": USER_EMAIL}],
-                "reminders": {"useDefault": False, "overrides": [{"method": "email", "minutes": 0}]}
-            },
-            sendUpdates="all"
-        ).execute()
-        return event.get("id")
-
-    def delete_event(self, event_id):
-        try:
-            self.cal.events().delete(calendarId=self.cal_id, eventId=event_id).execute()
-        except Exception:
-            pass
-
-    def delete_future_events(self, topic: str):
+    def list_future_events(self):
         now = datetime.utcnow().isoformat() + "Z"
         token = None
         while True:
-            resp = self.cal.events().list(calendarId=self.cal_id, timeMin=now, pageToken=token).execute()
-            for ev in resp.get("items", []):
-                if ev.get("summary") == f"Review: {topic}":
-                    try:
-                        self.cal.events().delete(calendarId=self.cal_id, eventId=ev["id"]).execute()
-                    except Exception:
-                        pass
+            resp = self.cal.events().list(
+                calendarId=self.cal_id, timeMin=now, pageToken=token, maxResults=2500,
+                fields="nextPageToken, items(id,summary,start,extendedProperties)"
+            ).execute()
+            yield from resp.get("items", [])
             token = resp.get("nextPageToken")
             if not token:
                 break
 
+    def reconcile(self, entries):
+        """
+        Bring the calendar in line with `entries` in one pass.
+
+        Future events are listed once and matched to topics through their
+        private extended property (or, for events created before tagging, their
+        summary). Only the inserts, patches and deletes needed are sent, in
+        batches. Returns {topic_key: event_id} for every scheduled topic.
+        """
+        today = datetime.utcnow().date().toordinal()
+        wanted = {}
+        by_summary = {}
+        for ent in entries:
+            key = self.topic_key(ent)
+            by_summary[f"Review: {ent.topic}"] = key
+            if ent.next_review > today:
+                wanted[key] = (ent.topic, ordinal_str(ent.next_review))
+
+        with self.lock:
+            existing = self._existing(by_summary)
+            result = {}
+            ops = self._plan(wanted, existing, result)
+            events = self.cal.events()
+            for evs in existing.values():
+                for ev in evs:
+                    ops.append((None, events.delete(calendarId=self.cal_id, eventId=ev["id"])))
+            self._send(ops, result)
+        return result
+
+    def apply(self, changes):
+        """
+        Apply journaled changes {topic_key: (topic, date or "")} with one
+        listing and batched requests; an empty date removes the topic's
+        events. Existing events are patched, so a reschedule is one request
+        rather than a delete and an insert. Returns ({key: event_id}, failed
+        keys).
+        """
+        with self.lock:
+            existing = self._existing({f"Review: {topic}": key for key, (topic, _) in changes.items()})
+            result = {}
+            ops = self._plan(changes, existing, result)
+            return result, self._send(ops, result)
+
+    def _existing(self, by_summary):
+        """Future events grouped by topic key (tag, or summary for old events)."""
+        existing = {}
+        for ev in self.list_future_events():
+            props = ev.get("extendedProperties", {}).get("private", {})
+            key = props.get(CAL_TOPIC_PROPERTY) or by_summary.get(ev.get("summary"))
+            if key is not None:
+                existing.setdefault(key, []).append(ev)
+        return existing
+
+    def _plan(self, wanted, existing, result):
+        """
+        Requests that bring `existing` in line with `wanted` ({key: (topic,
+        date)}), as (key, request) pairs. Matched events are popped from
+        `existing`; ones already correct go straight into `result`.
+        """
+        ops = []
+        events = self.cal.events()
+        for key, (topic, nr) in wanted.items():
+            body = self._event_body(topic, nr, key) if nr else None
+            evs = existing.pop(key, [])
+            if body is None:
+                ops += [(key, events.delete(calendarId=self.cal_id, eventId=ev["id"])) for ev in evs]
+                result[key] = ""
+                continue
+            if not evs:
+                ops.append((key, events.insert(calendarId=self.cal_id, body=body, sendUpdates="all")))
+                continue
+            keep, extra = evs[0], evs[1:]
+            start = keep.get("start", {})
+            tagged = keep.get("extendedProperties", {}).get("private", {}).get(CAL_TOPIC_PROPERTY) == key
+            if (
+                not tagged
+                or keep.get("summary") != body["summary"]
+                or (start.get("dateTime") or start.get("date", ""))[:10] != nr
+            ):
+                patch = {k: body[k] for k in ("summary", "description", "start", "end", "extendedProperties")}
+                ops.append((key, events.patch(calendarId=self.cal_id, eventId=keep["id"], body=patch)))
+            else:
+                result[key] = keep["id"]
+            for ev in extra:
+                ops.append((None, events.delete(calendarId=self.cal_id, eventId=ev["id"])))
+        return ops
+
+    def _send(self, ops, result):
+        """Run (key, request) pairs in batches; record event ids, return failed keys."""
+        failed = set()
+
+        def on_reply(request_id, response, exception):
+            key = keys[request_id]
+            if key is None:
+                return
+            if exception is not None:
+                # An event that is already gone is as good as deleted
+                if getattr(getattr(exception, "resp", None), "status", None) not in (404, 410):
+                    failed.add(key)
+            elif response and response.get("id"):
+                result[key] = response["id"]
+
+        for i in range(0, len(ops), CAL_BATCH_SIZE):
+            keys = {}
+            batch = self.cal.new_batch_http_request(callback=on_reply)
+            for n, (key, req) in enumerate(ops[i:i + CAL_BATCH_SIZE]):
+                keys[str(n)] = key
+                batch.add(req, request_id=str(n))
+            batch.execute()
+        for key in failed:
+            result.pop(key, None)
+        return failed
+
+# ─── PREFETCH ─────────────────────────────────────────────────────────────
+class Prefetcher:
+    """
+    Warms local_records/ in the background, one file at a time at
+    PREFETCH_PRIORITY so it never competes with a file the user is opening.
+    Urgent jobs (neighbours of the open file) jump the queue.
+    """
+    def __init__(self, engine, pool, after_fetch=None):
+        self.engine = engine
+        self.pool = pool
+        self.after_fetch = after_fetch
+        self.queue = OrderedDict()   # file id -> (dest, meta)
+        self.busy = False
+
+    def push(self, jobs, urgent=False):
+        for file_id, dest, meta in (reversed(jobs) if urgent else jobs):
+            if urgent:
+                self.queue[file_id] = (dest, meta)
+                self.queue.move_to_end(file_id, last=False)
+            elif file_id not in self.queue:
+                self.queue[file_id] = (dest, meta)
+        self._next()
+
+    def clear(self):
+        self.queue.clear()
+
+    def _next(self):
+        while not self.busy and self.queue:
+            file_id, (dest, meta) = self.queue.popitem(last=False)
+            if self.engine.manifest.check(file_id, dest, meta) == "ok":
+                continue
+            self.busy = True
+            w = Worker(self.engine.run, [(file_id, dest, meta)])
+            w.signals.finished.connect(self._done)
+            w.signals.error.connect(self._done)
+            self.pool.start(w, PREFETCH_PRIORITY)
+
+    def _done(self, _):
+        self.busy = False
+        if self.after_fetch:
+            self.after_fetch()
+        self._next()
+
+# ─── THUMBNAILS ───────────────────────────────────────────────────────────
+# PyMuPDF is not thread-safe: renders on the pool threads take turns
+FITZ_LOCK = threading.Lock()
+
+def render_thumbnail(pdf_path, out_path, width=THUMB_WIDTH):
+    """Render page 1 of `pdf_path` to a PNG `width` pixels wide."""
+    tmp = out_path + ".tmp.png"
+    with FITZ_LOCK:
+        with fitz.open(pdf_path) as doc:
+            page = doc[0]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        pix.save(tmp)
+    os.replace(tmp, out_path)
+    return True
+
+class ThumbnailCache(QObject):
+    """
+    First-page previews of cached PDFs, rendered with PyMuPDF on the thread
+    pool (one at a time, see FITZ_LOCK) and kept on disk keyed by the file's md5. Lookups never block: a
+    missing thumbnail is queued and `ready` fires with the file id once it
+    exists.
+    """
+    ready = pyqtSignal(str)
+
+    def __init__(self, manifest, pool, parent=None):
+        super().__init__(parent)
+        self.manifest = manifest
+        self.pool = pool
+        self.icons = {}      # md5 -> QIcon
+        self.pending = set()
+        THUMB_DIR.mkdir(exist_ok=True)
+
+    def _path(self, md5):
+        return THUMB_DIR / f"{md5}.png"
+
+    def image_path(self, file_id):
+        """PNG path of the thumbnail, or None (and queue it) if not rendered yet."""
+        m = self.manifest.get(file_id)
+        if m is None:
+            return None
+        path = self._path(m["md5"])
+        if path.exists():
+            return path
+        self._request(file_id, m)
+        return None
+
+    def icon(self, file_id):
+        m = self.manifest.get(file_id)
+        if m is None:
+            return None
+        if m["md5"] not in self.icons:
+            path = self.image_path(file_id)
+            if path is None:
+                return None
+            self.icons[m["md5"]] = QIcon(str(path))
+        return self.icons[m["md5"]]
+
+    def _request(self, file_id, m):
+        if file_id in self.pending or not m["path"].lower().endswith(".pdf"):
+            return
+        self.pending.add(file_id)
+        w = Worker(render_thumbnail, m["path"], str(self._path(m["md5"])))
+        w.signals.finished.connect(lambda _, fid=file_id: (self.pending.discard(fid), self.ready.emit(fid)))
+        w.signals.error.connect(lambda m, fid=file_id: (self.pending.discard(fid), print("Thumbnail failed:", fid, m)))
+        self.pool.start(w, THUMB_PRIORITY)
+
+# ─── PDF STREAMING ────────────────────────────────────────────────────────
+def register_stream_scheme():
+    """Declare srs:// to Qt WebEngine; must run before QApplication exists."""
+    scheme = QWebEngineUrlScheme(STREAM_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    flags = (
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalAccessAllowed
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    if hasattr(QWebEngineUrlScheme.Flag, "FetchApiAllowed"):  # Qt >= 6.6
+        flags |= QWebEngineUrlScheme.Flag.FetchApiAllowed
+    scheme.setFlags(flags)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+class StreamSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serves srs://file/<id>?start=<a>&end=<b> out of a StreamCache. Ranges are
+    read on the thread pool, so a Drive round trip never blocks the GUI.
+    """
+    def __init__(self, streams, pool, parent=None):
+        super().__init__(parent)
+        self.streams = streams
+        self.pool = pool
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        query = QUrlQuery(url)
+        file_id = url.path().strip("/")
+        try:
+            start = int(query.queryItemValue("start"))
+            end = int(query.queryItemValue("end"))
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.Error.RequestInvalid)
+            return
+
+        # The page may cancel the request (e.g. another file was opened)
+        alive = [True]
+        job.destroyed.connect(lambda: alive.__setitem__(0, False))
+
+        def reply(data):
+            if not alive[0]:
+                return
+            buf = QBuffer(job)
+            buf.setData(data)
+            buf.open(QIODevice.OpenModeFlag.ReadOnly)
+            if hasattr(job, "setAdditionalResponseHeaders"):  # Qt >= 6.6
+                job.setAdditionalResponseHeaders({b"Access-Control-Allow-Origin": b"*"})
+            job.reply(b"application/octet-stream", buf)
+
+        def failed(msg):
+            print("Streaming failed:", file_id, msg)
+            if alive[0]:
+                job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+
+        w = Worker(self.streams.read, file_id, start, end)
+        w.signals.finished.connect(reply)
+        w.signals.error.connect(failed)
+        self.pool.start(w, OPEN_PRIORITY)
+
 # ─── THREADING ───────────────────────────────────────────────────────────
 class TaskSignals(QObject):
     finished = pyqtSignal(object)
     error    = pyqtSignal(str)
+    progress = pyqtSignal(object)
+    started  = pyqtSignal()
+    settled  = pyqtSignal()   # always last, whether it ran, failed or was cancelled
 
 class Worker(QRunnable):
-    def __init__(self, fn, *args):
+    def __init__(self, fn, *args, progress=False):
         super().__init__()
         self.fn = fn
-        self.args = args
         self.signals = TaskSignals()
+        # progress=True passes signals.progress.emit as the last argument
+        self.args = (*args, self.signals.progress.emit) if progress else args
+        self.cancelled = False
+        self.running = False
+        self.priority = 0
+        self.key = self.group = None
 
     @pyqtSlot()
     def run(self):
         try:
-            res = self.fn(*self.args)
-        except Exception as e:
-            self.signals.error.emit(str(e))
-            return
-        self.signals.finished.emit(res)
+            if self.cancelled:
+                return
+            self.running = True
+            self.signals.started.emit()
+            try:
+                res = self.fn(*self.args)
+            except Exception as e:
+                if not self.cancelled:
+                    self.signals.error.emit(str(e))
+                return
+            if not self.cancelled:
+                self.signals.finished.emit(res)
+        finally:
+            self.signals.settled.emit()
+
+class TaskQueue(QObject):
+    """
+    Front door to the thread pools. A task's priority picks its lane:
+    interactive work (priority >= 0, e.g. OPEN_PRIORITY) has a pool of its
+    own, so it never waits behind background jobs; prefetch and indexing
+    share a smaller pool that runs them in priority order.
+
+    A task with a `key` is dropped while another with that key is queued or
+    running. `cancel(group)` supersedes every task started with that group:
+    queued ones never run and running ones finish silently. `changed`
+    carries metrics() whenever the queues move.
+    """
+    changed = pyqtSignal(dict)
+    LANES = ("interactive", "prefetch", "indexing")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.interactive = QThreadPool(self)
+        self.background = QThreadPool(self)
+        self.background.setMaxThreadCount(max(1, QThreadPool.globalInstance().maxThreadCount() // 2))
+        # Idle threads are kept, and with them their Google connections
+        # (see AuthorizedTransport)
+        for pool in (self.interactive, self.background):
+            pool.setExpiryTimeout(-1)
+        self.live = set()      # started and not yet settled
+        self.keys = {}         # key -> Worker
+        self.groups = {}       # group -> set of Worker
+        self.counts = {"done": 0, "dropped": 0, "cancelled": 0}
+
+    @staticmethod
+    def lane(priority):
+        if priority >= 0:
+            return "interactive"
+        return "prefetch" if priority > INDEX_PRIORITY else "indexing"
+
+    def start(self, worker, priority=0, key=None, group=None):
+        """Queue `worker`; False if a task with the same key is pending."""
+        if key is not None and key in self.keys:
+            self.counts["dropped"] += 1
+            return False
+        # We hold the reference until it settles, so the pool must not delete it
+        worker.setAutoDelete(False)
+        worker.priority, worker.key, worker.group = priority, key, group
+        self.live.add(worker)
+        if key is not None:
+            self.keys[key] = worker
+        if group is not None:
+            self.groups.setdefault(group, set()).add(worker)
+        worker.signals.started.connect(self._emit)
+        worker.signals.settled.connect(lambda w=worker: self._settled(w))
+        pool = self.interactive if priority >= 0 else self.background
+        pool.start(worker, priority)
+        self._emit()
+        return True
+
+    def cancel(self, group):
+        for w in self.groups.pop(group, ()):
+            w.cancelled = True
+
+    def _settled(self, w):
+        self.live.discard(w)
+        if self.keys.get(w.key) is w:
+            del self.keys[w.key]
+        if w.group in self.groups:
+            self.groups[w.group].discard(w)
+        self.counts["cancelled" if w.cancelled else "done"] += 1
+        self._emit()
+
+    def metrics(self):
+        """Running tasks, queue depth per lane, and lifetime counters."""
+        m = {"running": 0, **{lane: 0 for lane in self.LANES}, **self.counts}
+        for w in list(self.live):
+            if w.running:
+                m["running"] += 1
+            elif not w.cancelled:
+                m[self.lane(w.priority)] += 1
+        return m
+
+    def _emit(self):
+        self.changed.emit(self.metrics())
+
+    def shutdown(self):
+        """Drop background work that has not started and wait for the rest."""
+        for w in self.live:
+            if w.priority < 0:
+                w.cancelled = True
+        self.background.clear()
+        self.background.waitForDone()
+        self.interactive.waitForDone()
 
 # ─── SETTINGS DIALOG ──────────────────────────────────────────────────────
 class SettingsDialog(QDialog):
-    def __init__(self, files, parent=None):
+    def __init__(self, files, parent=None, thumbs=None):
         super().__init__(parent)
         self.setWindowTitle("File Settings")
         layout = QVBoxLayout(self)
         layout.addWidget(QLabel("Select a file to delete:"))
         self.combo = QComboBox()
-        self.combo.addItems([f["name"] for f in files])
+        self.combo.setIconSize(QSize(48, 64))
+        for f in files:
+            icon = thumbs.icon(f.id) if thumbs else None
+            if icon is not None:
+                self.combo.addItem(icon, f.name)
+            else:
+                self.combo.addItem(f.name)
         layout.addWidget(self.combo)
         btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         btns.accepted.connect(self.accept)
@@ -291,18 +1982,894 @@ class SettingsDialog(QDialog):
     def selected_index(self):
         return self.combo.currentIndex()
 
+# ─── FILE PICKER DIALOG ───────────────────────────────────────────────────
+class FilePickerDialog(QDialog):
+    """Grid of first-page thumbnails to choose a file from."""
+    def __init__(self, files, thumbs, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Choose File")
+        self.resize(720, 480)
+        self.files = files
+        self.thumbs = thumbs
+        layout = QVBoxLayout(self)
+        self.list = QListWidget()
+        self.list.setViewMode(QListView.ViewMode.IconMode)
+        self.list.setIconSize(QSize(THUMB_WIDTH, int(THUMB_WIDTH * 1.4)))
+        self.list.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list.setWordWrap(True)
+        for f in files:
+            item = QListWidgetItem(f.name)
+            if (icon := thumbs.icon(f.id)) is not None:
+                item.setIcon(icon)
+            self.list.addItem(item)
+        self.list.setCurrentRow(0)
+        self.list.itemDoubleClicked.connect(lambda _: self.accept())
+        thumbs.ready.connect(self._on_thumb)
+        layout.addWidget(self.list)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Open | QDialogButtonBox.StandardButton.Cancel)
+        btns.accepted.connect(self.accept)
+        btns.rejected.connect(self.reject)
+        layout.addWidget(btns)
+
+    def _on_thumb(self, file_id):
+        for i, f in enumerate(self.files):
+            if f.id == file_id and (icon := self.thumbs.icon(file_id)) is not None:
+                self.list.item(i).setIcon(icon)
+
+    def done(self, result):
+        self.thumbs.ready.disconnect(self._on_thumb)
+        super().done(result)
+
+    def selected_name(self):
+        r = self.list.currentRow()
+        return self.files[r].name if r >= 0 else None
+
+# ─── PDF SEARCH DIALOG ────────────────────────────────────────────────────
+class PdfSearchDialog(QDialog):
+    def __init__(self, hits, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("PDF Search")
+        self.resize(700, 400)
+        self.hits = hits
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{len(hits)} matching pages:"))
+        self.list = QListWidget()
+        for _, topic, name, page, snippet in hits:
+            self.list.addItem(f"{topic} — {name} (p. {page}): {' '.join(snippet.split())}")
+        self.list.itemDoubleClicked.connect(lambda _: self.accept())
+        layout.addWidget(self.list)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Open | QDialogButtonBox.StandardButton.Cancel)
+        btns.accepted.connect(self.accept)
+        btns.rejected.connect(self.reject)
+        layout.addWidget(btns)
+
+    def selected_hit(self):
+        r = self.list.currentRow()
+        return self.hits[r] if r >= 0 else None
+
 # ─── DASHBOARD DIALOG ─────────────────────────────────────────────────────
 class DashboardDialog(QDialog):
-    def __init__(self, stats, parent=None):
+    def __init__(self, stats, parent=None, report=None):
         super().__init__(parent)
         self.setWindowTitle("Dashboard")
         layout = QVBoxLayout(self)
         for k, v in stats.items():
             layout.addWidget(QLabel(f"{k}: {v}"))
+        if report is not None:
+            self.resize(640, 520)
+            tabs = QTabWidget()
+            for title, text in self._pages(report):
+                view = QPlainTextEdit(text)
+                view.setReadOnly(True)
+                view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+                tabs.addTab(view, title)
+            layout.addWidget(tabs)
         btn = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
         btn.rejected.connect(self.reject)
         layout.addWidget(btn)
 
+    @staticmethod
+    def _bars(pairs, width=40):
+        top = max([v for _, v in pairs] + [1])
+        return "\n".join(f"{label:>12} {'█' * round(width * v / top):<{width}} {v:g}" for label, v in pairs)
+
+    def _pages(self, report):
+        today = date.today()
+        fc = report["forecast"]
+        days = [((today + timedelta(days=i)).strftime("%a %d %b"), int(fc[i])) for i in range(14)]
+        weeks = [
+            ((today + timedelta(days=i)).strftime("wk %d %b"), int(fc[i:i + 7].sum()))
+            for i in range(14, len(fc), 7)
+        ]
+        yield "Forecast", "Due per day\n" + self._bars(days) + "\n\nDue per week\n" + self._bars(weeks)
+
+        edges = INTERVAL_BINS + [None]
+        labels = [
+            f"{a}d+" if b is None else f"{a}d" if b == a + 1 else f"{a}-{b - 1}d"
+            for a, b in zip(edges, edges[1:])
+        ]
+        yield "Intervals", (
+            "Scheduled intervals\n" + self._bars(list(zip(labels, report["scheduled_hist"])))
+            + "\n\nGaps between logged reviews\n" + self._bars(list(zip(labels, report["gap_hist"])))
+        )
+
+        mix = report["difficulty_mix"]
+        lines = [f"{'month':>8} " + " ".join(f"{c:>9}" for c in mix.columns)]
+        lines += [f"{str(m):>8} " + " ".join(f"{int(v):>9}" for v in row) for m, row in zip(mix.index, mix.values)]
+        yield "Difficulty", "\n".join(lines)
+
+        ret = report["retention"]
+        if ret is None:
+            yield "Retention", "Not enough review history yet."
+            return
+        observed = [(lab, round(100 * r)) for lab, r in zip(labels, ret["observed"]) if not np.isnan(r)]
+        curve = [(f"day {d}", round(100 * ret["curve"][d - 1])) for d in (1, 3, 7, 14, 30, 60, RETENTION_DAYS)]
+        yield "Retention", (
+            "Recalled (not rated Difficult) by gap, %\n" + self._bars(observed)
+            + f"\n\nFitted curve, stability {ret['stability']:.1f} days, %\n" + self._bars(curve)
+        )
+
+# ─── ANALYTICS ────────────────────────────────────────────────────────────
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def log_frame(by_topic):
+    """
+    Study log ({topic: [(date, difficulty, comment)]}) as columns sorted by
+    topic and day: topic code, name, date, day ordinal, difficulty, month.
+    """
+    df = pandas.DataFrame(
+        [(t, d, diff) for t, items in by_topic.items() for d, diff, _ in items],
+        columns=["name", "date", "difficulty"],
+    )
+    when = pandas.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+    df = df.assign(when=when).dropna(subset=["when"])
+    df["day"] = df["when"].values.astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+    df["topic"] = pandas.factorize(df["name"])[0]
+    df["month"] = df["date"].str[:7]
+    return df.sort_values(["topic", "day"], kind="stable")
+
+class ReviewStats:
+    """
+    Dashboard numbers from the review rows and the study log, computed with
+    numpy/pandas over whole columns. The result is cached until
+    `invalidate()` (called on every save), so reopening the dashboard is free.
+    """
+    def __init__(self):
+        self._report = None
+
+    def invalidate(self):
+        self._report = None
+
+    def report(self, rows, logs):
+        if self._report is None:
+            self._report = self._compute(rows, logs)
+        return self._report
+
+    def _compute(self, rows, logs):
+        today = date.today().toordinal()
+        last = np.fromiter((e.last_review for e in rows), np.int64, len(rows))
+        nxt = np.fromiter((e.next_review for e in rows), np.int64, len(rows))
+        edges = INTERVAL_BINS + [np.iinfo(np.int64).max]
+
+        # Due counts for the next FORECAST_DAYS (overdue topics count today)
+        offs = np.maximum(nxt[nxt > 0] - today, 0)
+        forecast = np.bincount(offs[offs < FORECAST_DAYS], minlength=FORECAST_DAYS)
+
+        scheduled = (nxt - last)[(last > 0) & (nxt > last)]
+        scheduled_hist = np.histogram(scheduled, bins=edges)[0]
+
+        # Gaps between consecutive reviews of a topic, and whether the later
+        # review went well (anything but "Difficult" counts as recalled)
+        df = log_frame(logs.by_topic)
+        topic, day = df["topic"].to_numpy(), df["day"].to_numpy()
+        same = topic[1:] == topic[:-1]
+        gaps = (day[1:] - day[:-1])[same]
+        recalled = (df["difficulty"].to_numpy()[1:] != "Difficult")[same]
+        keep = gaps > 0
+        gaps, recalled = gaps[keep], recalled[keep]
+        gap_hist = np.histogram(gaps, bins=edges)[0]
+
+        mix = pandas.crosstab(df["month"], df["difficulty"]) if len(df) else pandas.DataFrame()
+
+        return {
+            "summary": {
+                "Total Topics": len(rows),
+                "Upcoming ≤7d": int(((nxt > 0) & (nxt <= today + 7)).sum()),
+                "Overdue": int(((nxt > 0) & (nxt < today)).sum()),
+                "Avg Interval(days)": round(float(scheduled.mean()), 1) if scheduled.size else 0,
+                "Reviews Logged": len(df),
+            },
+            "forecast": forecast,
+            "scheduled_hist": scheduled_hist,
+            "gap_hist": gap_hist,
+            "difficulty_mix": mix,
+            "retention": self._retention(gaps, recalled, edges),
+        }
+
+    @staticmethod
+    def _retention(gaps, recalled, edges):
+        """
+        Observed recall rate per gap bin, and an exponential forgetting curve
+        R(t) = exp(-t / S) fitted to it by weighted least squares on ln R.
+        """
+        if gaps.size < 2:
+            return None
+        idx = np.digitize(gaps, edges) - 1
+        n = np.bincount(idx, minlength=len(edges) - 1)
+        hits = np.bincount(idx, weights=recalled, minlength=len(edges) - 1)
+        t = np.bincount(idx, weights=gaps, minlength=len(edges) - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            observed = hits / n
+            t = t / n
+        ok = n > 0
+        r = np.clip(observed[ok], 0.01, 0.99)
+        w, t = n[ok], t[ok]
+        stability = float((w * t * t).sum() / (w * t * -np.log(r)).sum())
+        curve = np.exp(-np.arange(1, RETENTION_DAYS + 1) / stability)
+        return {"observed": observed, "stability": stability, "curve": curve}
+
+# ─── SCHEDULING ───────────────────────────────────────────────────────────
+class Scheduler:
+    """
+    Turns a topic's review history into its next review date.
+
+    `replay(frame)` runs over the whole study log at once (a log_frame): the
+    k-th review of every topic is processed in one numpy step, so the loop
+    is over review depth, not rows. It returns {topic: next_review ordinal}.
+    `fit(frame)` tunes parameters to the log first. With `batch` set, the app
+    refits and reschedules every topic on load.
+    """
+    name = ""
+    batch = False
+
+    def fit(self, frame):
+        pass
+
+    def replay(self, frame):
+        raise NotImplementedError
+
+    def next_review(self, ent, items, today, diff):
+        """
+        Next review ordinal for `ent` after `items` (its log, today's review
+        included), `diff` being the difficulty just logged.
+        """
+        nxt = self.replay(log_frame({ent.topic: items})).get(ent.topic, 0)
+        return max(nxt, today + 1)
+
+    @staticmethod
+    def _steps(frame):
+        """Yield (topic codes, day, difficulty) of the k-th review of each topic, k = 0, 1, …"""
+        if frame.empty:
+            return
+        topic = frame["topic"].to_numpy()
+        day = frame["day"].to_numpy()
+        diff = frame["difficulty"].to_numpy()
+        rank = frame.groupby("topic").cumcount().to_numpy()
+        order = np.argsort(rank, kind="stable")
+        bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2))
+        for k in range(len(bounds) - 1):
+            idx = order[bounds[k]:bounds[k + 1]]
+            yield topic[idx], day[idx], diff[idx]
+
+    @staticmethod
+    def _result(frame, last, interval):
+        names = pandas.unique(frame["name"]) if not frame.empty else []
+        nxt = last + np.maximum(interval, 1).astype(np.int64)
+        return dict(zip(names, nxt.tolist()))
+
+class LegacyScheduler(Scheduler):
+    """The original rule: 1/3/7 days first, then the last gap × 1.2/1.5/2.0."""
+    name = "legacy"
+    FIRST = {"Difficult": 1, "Medium": 3, "Easy": 7}
+    FACTOR = {"Difficult": 1.2, "Medium": 1.5, "Easy": 2.0}
+
+    def next_review(self, ent, items, today, diff):
+        if not ent.last_review:
+            return today + self.FIRST.get(diff, 3)
+        delta = max(1, today - ent.last_review)
+        return today + max(1, round(delta * self.FACTOR.get(diff, 1.5)))
+
+    def replay(self, frame):
+        n = frame["topic"].nunique()
+        last = np.zeros(n, np.int64)
+        interval = np.zeros(n)
+        first = np.vectorize(lambda d: self.FIRST.get(d, 3), otypes=[float])
+        factor = np.vectorize(lambda d: self.FACTOR.get(d, 1.5), otypes=[float])
+        for k, (t, day, diff) in enumerate(self._steps(frame)):
+            if k == 0:
+                interval[t] = first(diff)
+            else:
+                interval[t] = np.maximum(1, np.round(np.maximum(1, day - last[t]) * factor(diff)))
+            last[t] = day
+        return self._result(frame, last, interval)
+
+class SM2Scheduler(Scheduler):
+    """
+    SuperMemo-2. Difficult/Medium/Easy are quality 3/4/5, so every logged
+    review counts as recalled. SM-2 has no per-user parameters; fit is a no-op.
+    """
+    name = "sm2"
+    batch = True
+    QUALITY = {"Difficult": 3, "Medium": 4, "Easy": 5}
+
+    def replay(self, frame):
+        n = frame["topic"].nunique()
+        ef = np.full(n, 2.5)
+        reps = np.zeros(n, np.int64)
+        interval = np.zeros(n)
+        last = np.zeros(n, np.int64)
+        quality = np.vectorize(lambda d: self.QUALITY.get(d, 4), otypes=[float])
+        for t, day, diff in self._steps(frame):
+            q = quality(diff)
+            r = reps[t]
+            iv = np.where(r == 0, 1.0, np.where(r == 1, 6.0, np.round(interval[t] * ef[t])))
+            interval[t] = np.where(q < 3, 1.0, iv)
+            reps[t] = np.where(q < 3, 0, r + 1)
+            ef[t] = np.maximum(1.3, ef[t] + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+            last[t] = day
+        return self._result(frame, last, interval)
+
+class FSRSScheduler(Scheduler):
+    """
+    FSRS-4.5 memory model (stability S, difficulty D, retrievability
+    R = (1 + F·t/S)^-0.5), scheduling each topic when R is expected to drop
+    to `retention`. Difficult is treated as a lapse (Again), Medium as Good
+    and Easy as Easy, matching how the dashboard estimates recall.
+
+    `fit` tunes the weights that matter most for a single user's history
+    (initial stabilities, growth and lapse scale) by coordinate descent on
+    the log loss of predicted R against observed recall, each candidate
+    scored by one vectorized replay.
+    """
+    name = "fsrs"
+    batch = True
+    DECAY = -0.5
+    F = 19 / 81
+    RATING = {"Difficult": 1, "Medium": 3, "Easy": 4}
+    WEIGHTS = [0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+               0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755]
+    FIT_PARAMS = (0, 2, 3, 8, 11)
+    FIT_STEPS = (0.5, 0.8, 1.25, 2.0)
+
+    def __init__(self, retention=0.9, weights=None):
+        self.retention = retention
+        self.w = np.array(weights or self.WEIGHTS, dtype=float)
+
+    def _run(self, frame, w):
+        n = frame["topic"].nunique()
+        S = np.zeros(n)
+        D = np.zeros(n)
+        last = np.zeros(n, np.int64)
+        loss, count = 0.0, 0
+        rating = np.vectorize(lambda d: self.RATING.get(d, 3), otypes=[float])
+        d0_good = w[4]
+        for k, (t, day, diff) in enumerate(self._steps(frame)):
+            g = rating(diff)
+            if k == 0:
+                S[t] = w[(g - 1).astype(int)]
+                D[t] = np.clip(w[4] - (g - 3) * w[5], 1, 10)
+            else:
+                s, d = S[t], D[t]
+                elapsed = np.maximum(day - last[t], 0)
+                r = (1 + self.F * elapsed / s) ** self.DECAY
+                y = g > 1
+                rc = np.clip(r, 1e-6, 1 - 1e-6)
+                loss -= np.sum(np.where(y, np.log(rc), np.log(1 - rc)))
+                count += len(t)
+                recall = s * (1 + np.exp(w[8]) * (11 - d) * s ** -w[9] * np.expm1(w[10] * (1 - r))
+                              * np.where(g == 2, w[15], 1) * np.where(g == 4, w[16], 1))
+                forget = w[11] * d ** -w[12] * ((s + 1) ** w[13] - 1) * np.exp(w[14] * (1 - r))
+                S[t] = np.maximum(np.where(y, recall, np.minimum(forget, s)), 0.01)
+                D[t] = np.clip(w[7] * d0_good + (1 - w[7]) * (d - w[6] * (g - 3)), 1, 10)
+            last[t] = day
+        return S, last, (loss / count if count else 0.0)
+
+    def fit(self, frame):
+        if frame.empty or frame["topic"].value_counts().max() < 2:
+            return
+        best = self._run(frame, self.w)[2]
+        for _ in range(2):
+            for i in self.FIT_PARAMS:
+                for step in self.FIT_STEPS:
+                    w = self.w.copy()
+                    w[i] *= step
+                    score = self._run(frame, w)[2]
+                    if score < best:
+                        best, self.w = score, w
+
+    def replay(self, frame):
+        S, last, _ = self._run(frame, self.w)
+        interval = np.round(S / self.F * (self.retention ** (1 / self.DECAY) - 1))
+        return self._result(frame, last, interval)
+
+SCHEDULERS = {cls.name: cls for cls in (LegacyScheduler, SM2Scheduler, FSRSScheduler)}
+
+class DueLoad:
+    """
+    Per-day due counts (date ordinal -> topics due), updated as single dates
+    change instead of recounted from full_data. `place` picks where a newly
+    scheduled review should land so busy days are not piled onto.
+    """
+    def __init__(self, cap=DAILY_CAP):
+        self.cap = cap
+        self.counts = {}
+
+    def rebuild(self, rows):
+        self.counts = {}
+        for e in rows:
+            self.add(e.next_review)
+
+    def add(self, day):
+        if day:
+            self.counts[day] = self.counts.get(day, 0) + 1
+
+    def remove(self, day):
+        n = self.counts.get(day, 0)
+        if n > 1:
+            self.counts[day] = n - 1
+        elif n:
+            del self.counts[day]
+
+    def move(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+    def _room(self, day):
+        return not self.cap or self.counts.get(day, 0) < self.cap
+
+    def place(self, target, interval, earliest):
+        """Best day near `target` for a review `interval` days out, not before `earliest`."""
+        w = min(FUZZ_MAX_DAYS, round(interval * FUZZ_FRACTION)) if interval >= FUZZ_MIN_INTERVAL else 0
+        lo = max(earliest, target - w)
+        hi = max(lo, target + w)
+        days = [d for d in range(lo, hi + 1) if self._room(d)]
+        if not days:
+            spill = next((d for d in range(hi + 1, hi + 1 + SPILL_DAYS) if self._room(d)), None)
+            if spill is not None:
+                return spill
+            days = range(lo, hi + 1)
+        return min(days, key=lambda d: (self.counts.get(d, 0), abs(d - target)))
+
+# ─── TABLE MODEL ──────────────────────────────────────────────────────────
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+class ReviewTableModel(QAbstractTableModel):
+    """
+    Model over ReviewApp.full_data (the list is shared, not copied). Cells are
+    computed on demand, so only visible rows cost anything. Next Review edits
+    are reported through `nextReviewEdited`; the app applies them and calls
+    row_changed().
+    """
+    HEADERS = ["Topic", "Files", "Last Review", "Next Review"]
+    nextReviewEdited = pyqtSignal(object, QDate)
+
+    def __init__(self, parent=None, thumbs=None):
+        super().__init__(parent)
+        self.rows = []
+        self.thumbs = thumbs
+        self.today = date.today().toordinal()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.today = date.today().toordinal()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def _schedulable(self, e):
+        # Only reviewed topics with a future date get a date picker
+        return bool(e.last_review) and e.next_review > self.today
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        if index.column() == 3 and self._schedulable(self.rows[index.row()]):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        e = self.rows[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return e.topic
+            if col == 1:
+                return ", ".join(f.name for f in e.files)
+            if col == 2:
+                return ordinal_str(e.last_review)
+            # Blank if never reviewed, "Expired" once the date has passed
+            if not e.last_review or not e.next_review:
+                return ""
+            return "Expired" if e.next_review <= self.today else ordinal_str(e.next_review)
+        if role == Qt.ItemDataRole.EditRole and col == 3:
+            return ordinal_qdate(e.next_review)
+        if col == 1 and self.thumbs and role in (
+            Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.ToolTipRole
+        ):
+            if not e.files:
+                return None
+            first = e.files[0]
+            if role == Qt.ItemDataRole.DecorationRole:
+                return self.thumbs.icon(first.id)
+            path = self.thumbs.image_path(first.id)
+            if path is None:
+                return None
+            return f'<img src="{QUrl.fromLocalFile(str(path.resolve())).toString()}"><br>{first.name}'
+        if role == SORT_ROLE:
+            if col == 0:
+                return e.topic.lower()
+            if col == 2:
+                return e.last_review
+            if col == 3:
+                return e.next_review
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != 3:
+            return False
+        self.nextReviewEdited.emit(self.rows[index.row()], value)
+        return True
+
+    def _row_of(self, ent):
+        return next((i for i, e in enumerate(self.rows) if e is ent), -1)
+
+    def row_changed(self, ent):
+        r = self._row_of(ent)
+        if r >= 0:
+            self.dataChanged.emit(self.index(r, 0), self.index(r, len(self.HEADERS) - 1))
+
+    def refresh(self):
+        self.today = date.today().toordinal()
+        if self.rows:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(len(self.rows) - 1, len(self.HEADERS) - 1)
+            )
+
+    def append_row(self, ent):
+        n = len(self.rows)
+        self.beginInsertRows(QModelIndex(), n, n)
+        self.rows.append(ent)
+        self.endInsertRows()
+
+    def remove_row(self, ent):
+        r = self._row_of(ent)
+        if r < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), r, r)
+        del self.rows[r]
+        self.endRemoveRows()
+
+class DateDelegate(QStyledItemDelegate):
+    """Date picker for Next Review, created only while a cell is edited."""
+    def createEditor(self, parent, option, index):
+        editor = QDateEdit(parent)
+        editor.setCalendarPopup(True)
+        editor.setDisplayFormat("yyyy-MM-dd")
+        return editor
+
+    def setEditorData(self, editor, index):
+        d = index.data(Qt.ItemDataRole.EditRole)
+        editor.setDate(d if d is not None and d.isValid() else QDate.currentDate())
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.date(), Qt.ItemDataRole.EditRole)
+
+# ─── STUDY LOG ────────────────────────────────────────────────────────────
+class LogIndex:
+    """
+    Study log grouped by topic: topic -> [(review_date, difficulty, comment)]
+    kept in date order. Built once per load and updated as reviews are
+    logged, so showing a topic's history never scans the whole log.
+    """
+    def __init__(self, entries=()):
+        self.by_topic = {}
+        for e in entries:
+            self.by_topic.setdefault(e["topic"], []).append(self._item(e))
+        for items in self.by_topic.values():
+            items.sort(key=lambda it: it[0])
+
+    @staticmethod
+    def _item(e):
+        return (e.get("review_date", ""), e.get("difficulty", ""), e.get("comment", ""))
+
+    def add(self, entry):
+        # Keyed on the date alone so same-day reviews stay in logging order
+        bisect.insort(self.by_topic.setdefault(entry["topic"], []), self._item(entry),
+                      key=lambda it: it[0])
+
+    def entries(self, topic):
+        return self.by_topic.get(topic, [])
+
+    def __iter__(self):
+        # As log-row dicts, for SearchIndex.rebuild
+        for topic, items in self.by_topic.items():
+            for day, diff, comment in items:
+                yield {"topic": topic, "review_date": day, "difficulty": diff, "comment": comment}
+
+class LogListModel(QAbstractListModel):
+    """
+    One topic's log, newest first. Only LOG_PAGE_SIZE rows are exposed at a
+    time; the view asks for more (fetchMore) when scrolled to the bottom.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.topic = None
+        self.items = []
+        self.shown = 0
+
+    def set_topic(self, topic, items):
+        self.beginResetModel()
+        self.topic = topic
+        self.items = items
+        self.shown = min(LOG_PAGE_SIZE, len(items))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.shown
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.shown < len(self.items)
+
+    def fetchMore(self, parent):
+        n = min(LOG_PAGE_SIZE, len(self.items) - self.shown)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.shown, self.shown + n - 1)
+        self.shown += n
+        self.endInsertRows()
+
+    def data(self, idx, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not idx.isValid():
+            return None
+        day, diff, comment = self.items[len(self.items) - 1 - idx.row()]
+        return f"{day} ({diff}): {comment}"
+
+# ─── SEARCH ───────────────────────────────────────────────────────────────
+def normalize_tokens(text):
+    """Case-folded, accent-stripped word tokens."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+class SearchIndex:
+    """
+    Inverted index over topic names, file names and study-log comments.
+
+    Tokens map to {topic: weight}; every 1-3 character n-gram of a token maps
+    back to the tokens containing it, so a query word is resolved to matching
+    vocabulary (substring match) without scanning the rows. Topics are
+    updated one at a time as their files or logs change.
+    """
+    NGRAM = 3
+
+    def __init__(self):
+        self.postings = {}   # token -> {topic: weight}
+        self.grams = {}      # n-gram -> {token}
+        self.docs = {}       # topic -> {token: weight} (for removal)
+        self.comments = {}   # topic -> [comment tokens]
+
+    def rebuild(self, rows, logs):
+        self.__init__()
+        for entry in logs:
+            self.comments.setdefault(entry["topic"], []).extend(normalize_tokens(entry.get("comment", "")))
+        for ent in rows:
+            self.index_topic(ent)
+
+    def index_topic(self, ent):
+        topic = ent.topic
+        self.remove_topic(topic, keep_comments=True)
+        doc = {}
+        fields = [("topic", normalize_tokens(topic))]
+        fields += [("file", normalize_tokens(f.name)) for f in ent.files]
+        fields.append(("comment", self.comments.get(topic, [])))
+        for field, tokens in fields:
+            w = SEARCH_WEIGHTS[field]
+            for tok in tokens:
+                if w > doc.get(tok, 0):
+                    doc[tok] = w
+        self.docs[topic] = doc
+        for tok, w in doc.items():
+            if tok not in self.postings:
+                self.postings[tok] = {}
+                for g in self._ngrams(tok):
+                    self.grams.setdefault(g, set()).add(tok)
+            self.postings[tok][topic] = w
+
+    def add_log(self, entry):
+        topic = entry["topic"]
+        tokens = normalize_tokens(entry.get("comment", ""))
+        self.comments.setdefault(topic, []).extend(tokens)
+        doc = self.docs.get(topic)
+        if doc is None:
+            return
+        w = SEARCH_WEIGHTS["comment"]
+        for tok in tokens:
+            if tok in doc:
+                continue
+            doc[tok] = w
+            if tok not in self.postings:
+                self.postings[tok] = {}
+                for g in self._ngrams(tok):
+                    self.grams.setdefault(g, set()).add(tok)
+            self.postings[tok][topic] = w
+
+    def remove_topic(self, topic, keep_comments=False):
+        for tok in self.docs.pop(topic, {}):
+            post = self.postings.get(tok)
+            if post is None:
+                continue
+            post.pop(topic, None)
+            if not post:
+                del self.postings[tok]
+                for g in self._ngrams(tok):
+                    self.grams[g].discard(tok)
+                    if not self.grams[g]:
+                        del self.grams[g]
+        if not keep_comments:
+            self.comments.pop(topic, None)
+
+    def _ngrams(self, tok):
+        return {tok[i:i + n] for n in range(1, self.NGRAM + 1) for i in range(len(tok) - n + 1)}
+
+    def _vocab(self, q):
+        if len(q) <= self.NGRAM:
+            return self.grams.get(q, ())
+        sets = sorted(
+            (self.grams.get(q[i:i + self.NGRAM], set()) for i in range(len(q) - self.NGRAM + 1)),
+            key=len
+        )
+        return [tok for tok in sets[0].intersection(*sets[1:]) if q in tok]
+
+    def query(self, text):
+        """
+        Topics matching every word of `text`, best first; None for an empty
+        query. Exact and prefix word matches rank above infix ones.
+        """
+        words = normalize_tokens(text)
+        if not words:
+            return None
+        scores = None
+        for q in words:
+            hits = {}
+            for tok in self._vocab(q):
+                bonus = 2 if tok == q else 1 if tok.startswith(q) else 0
+                for topic, w in self.postings[tok].items():
+                    if w + bonus > hits.get(topic, 0):
+                        hits[topic] = w + bonus
+            if scores is None:
+                scores = hits
+            else:
+                scores = {t: scores[t] + sc for t, sc in hits.items() if t in scores}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda t: (-scores[t], t))
+
+def extract_pdf_pages(path):
+    """Text of every page of `path` (runs in a worker process)."""
+    try:
+        with fitz.open(path) as doc:
+            return [page.get_text() for page in doc]
+    except Exception:
+        return []
+
+class PdfTextIndex:
+    """
+    Persistent full-text index of the PDFs in local_records/.
+
+    Page text lives in an SQLite FTS5 table; each indexed file is recorded
+    with the md5 it was extracted from, so only new or changed files are
+    re-extracted.
+    """
+    def __init__(self, path=FULLTEXT_DB):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    file_id TEXT PRIMARY KEY, md5 TEXT, topic TEXT, name TEXT
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+                    text, file_id UNINDEXED, page UNINDEXED,
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+            """)
+
+    def stale(self, files):
+        """Subset of `files` [(file_id, md5, path, topic, name)] not indexed at that md5."""
+        with self.lock:
+            known = dict(self.db.execute("SELECT file_id, md5 FROM docs").fetchall())
+        return [f for f in files if known.get(f[0]) != f[1]]
+
+    def prune(self, keep_ids):
+        with self.lock, self.db:
+            gone = [fid for (fid,) in self.db.execute("SELECT file_id FROM docs") if fid not in keep_ids]
+            for fid in gone:
+                self._remove(fid)
+
+    def _remove(self, file_id):
+        self.db.execute("DELETE FROM pages WHERE file_id=?", (file_id,))
+        self.db.execute("DELETE FROM docs WHERE file_id=?", (file_id,))
+
+    def add(self, file_id, md5, topic, name, pages):
+        with self.lock, self.db:
+            self._remove(file_id)
+            self.db.executemany(
+                "INSERT INTO pages (text, file_id, page) VALUES (?, ?, ?)",
+                [(text, file_id, i + 1) for i, text in enumerate(pages) if text.strip()]
+            )
+            self.db.execute(
+                "INSERT INTO docs (file_id, md5, topic, name) VALUES (?, ?, ?, ?)",
+                (file_id, md5, topic, name)
+            )
+
+    def update(self, files, workers=None):
+        """Extract and index every stale file; returns how many were indexed."""
+        todo = self.stale(files)
+        if not todo:
+            return 0
+        # Spawn, not fork: forking a process that runs Qt threads can deadlock the child
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx) as ex:
+            for (fid, md5, _, topic, name), pages in zip(
+                todo, ex.map(extract_pdf_pages, [f[2] for f in todo], chunksize=4)
+            ):
+                self.add(fid, md5, topic, name, pages)
+        return len(todo)
+
+    def search(self, text, limit=FULLTEXT_HITS):
+        """Best (file_id, topic, name, page, snippet) hits for every word of `text`."""
+        words = normalize_tokens(text)
+        if not words:
+            return []
+        match = " ".join(f'"{w}"*' for w in words)
+        with self.lock:
+            return self.db.execute(
+                """
+                SELECT p.file_id, d.topic, d.name, p.page,
+                       snippet(pages, 0, '[', ']', '…', 12)
+                FROM pages p JOIN docs d ON d.file_id = p.file_id
+                WHERE pages MATCH ? ORDER BY bm25(pages) LIMIT ?
+                """,
+                (match, limit)
+            ).fetchall()
+
+class SearchProxy(QSortFilterProxyModel):
+    """Shows only topics returned by SearchIndex.query, ranked unless sorted by a column."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ranks = None     # topic -> rank, or None when no query is active
+        self.by_rank = False
+
+    def set_matches(self, topics, by_rank):
+        self.ranks = None if topics is None else {t: i for i, t in enumerate(topics)}
+        self.by_rank = by_rank and self.ranks is not None
+        self.invalidate()
+        if self.by_rank:
+            self.sort(0, Qt.SortOrder.AscendingOrder)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.ranks is None:
+            return True
+        return self.sourceModel().rows[source_row].topic in self.ranks
+
+    def lessThan(self, left, right):
+        if self.by_rank:
+            rows = self.sourceModel().rows
+            return (self.ranks.get(rows[left.row()].topic, 0)
+                    < self.ranks.get(rows[right.row()].topic, 0))
+        return super().lessThan(left, right)
+
 # OAuth & credential helpers
 SCOPES = [
     "https://www.googleapis.com/auth/drive",
@@ -315,12 +2882,13 @@ def get_user_credentials():
     if token_path.exists():
         with open(token_path, "rb") as token:
             creds = pickle.load(token)
+    if creds and creds.refresh_token:
+        # An expired token is refreshed by the first API call, off the GUI thread
+        return creds
     if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(str(OAUTH_CREDENTIALS_FILE), SCOPES)
-            creds = flow.run_local_server(port=0)
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(str(OAUTH_CREDENTIALS_FILE), SCOPES)
+        creds = flow.run_local_server(port=0)
         with open(token_path, "wb") as token:
             pickle.dump(creds, token)
     return creds
@@ -334,55 +2902,269 @@ class ReviewApp(QMainWindow):
         # Change the QSettings namespace to your own, e.g. ("MyOrg", "MyApp")
         self.settings = QSettings("MyOrg", "MyApp")
 
-        creds = get_user_credentials()
+        creds = STARTUP.timed("credentials", get_user_credentials)
         self.uploader = DriveUploader(creds, SHARED_ROOT_FOLDER_ID)
+        self._bot_uploader = None
 
-        bot_creds = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE,
-            scopes=["https://www.googleapis.com/auth/drive"]
-        )
-        self.bot_uploader = DriveUploader(bot_creds, SHARED_ROOT_FOLDER_ID)
-
-        self.ensure_root_shared()
         self.calendar = CalendarManager(creds, USER_EMAIL)
-        self.pool = QThreadPool()
+        self.manifest = CacheManifest()
+        self.cache = CachePolicy(
+            self.manifest, self.settings.value("cache_budget_mb", CACHE_BUDGET_MB, type=int) * 2**20
+        )
+        self.downloads = DownloadEngine(
+            self.uploader, self.manifest,
+            self.settings.value("download_workers", DOWNLOAD_WORKERS, type=int)
+        )
+        self.streams = StreamCache(self.uploader, self.manifest)
+        self.pool = TaskQueue(self)
+        self.prefetcher = Prefetcher(
+            self.downloads, self.pool,
+            after_fetch=lambda: self.cache.enforce(self._protected_file_ids())
+        )
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(CSV_FLUSH_DELAY_MS)
+        self.flush_timer.timeout.connect(self._flush)
+        self._retry_ms = CSV_FLUSH_DELAY_MS
+        self._flushing = False
         self.full_data = []
-        self.data = []
-        self.logs = []
+        self.logs = LogIndex()
+        self._logged = []   # (journal seq, entry) of reviews logged since the last load
+        self.stats = ReviewStats()
+        self.scheduler = SCHEDULERS.get(self.settings.value("scheduler", "legacy"), LegacyScheduler)()
+        self.balance = self.settings.value("load_balance", False, type=bool)
+        self.load = DueLoad(self.settings.value("daily_cap", DAILY_CAP, type=int))
         self.sort_states = {}
-        self.current_row = -1
+        self.current_index = QPersistentModelIndex()
         self.current_file_index = 0
+        self._reopen = None
 
-        self._startup_sync()
+        # Show the last known state at once; Drive is reconciled behind it
         self._init_ui()
         self._restore_ui_settings()
         self._set_ui_enabled(False)
         self._restore_last_opened()
-        self._load_data()
+        self._show_snapshot()
+        self._load_data(startup=True)
+        self._schedule_flush()
+
+    @property
+    def bot_uploader(self):
+        """Service-account uploader, created the first time it is needed."""
+        if self._bot_uploader is None:
+            bot_creds = service_account.Credentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE,
+                scopes=["https://www.googleapis.com/auth/drive"]
+            )
+            self._bot_uploader = DriveUploader(bot_creds, SHARED_ROOT_FOLDER_ID)
+        return self._bot_uploader
+
+    def _show_snapshot(self):
+        """Render rows and study log from LOCAL_DB without touching the network."""
+        store = self.uploader.store
+        rows = [ReviewRow.from_csv(r) for r in store.rows()]
+        if not rows:
+            return
+        self.full_data = rows
+        self.logs = LogIndex(store.log_rows() + store.pending_logs())
+        self.load.rebuild(rows)
+        self._set_ui_enabled(True)
+        self.populate_table()
+        self.show()
+        QTimer.singleShot(0, lambda: STARTUP.since_start("first paint"))
+        self._run_reopen()
 
     def _startup_sync(self):
-        # 1) get all Drive topic names
-        drive_folders = self.uploader.list_topic_folders()
-        drive_topics  = {f["name"] for f in drive_folders}
+        """
+        Background half of startup: re-resolve the Drive ids, make sure the
+        root folder is shared, apply Drive changes, then read everything.
+        """
+        self.uploader.resolve()
+        self.ensure_root_shared()
+        self._sync_changes()
+        return self._read_rows()
 
-        # 2) prune review_log.csv to only existing Drive topics
-        csv_rows = self.uploader.read_csv()
-        kept     = [r for r in csv_rows if r["topic"] in drive_topics]
-        if len(kept) != len(csv_rows):
-            self.uploader.write_csv(kept)
+    def _sync_changes(self, progress=None):
+        """
+        Bring review_log.csv and local_records/ up to date with Drive.
 
-        # 3) prune study_log.csv to those same topics
-        log_rows = self.uploader.read_log()
-        kept_logs = [l for l in log_rows if l["topic"] in drive_topics]
-        if len(kept_logs) != len(log_rows):
-            self.uploader.write_log(kept_logs)
+        With a saved change token only the Drive change feed since the last
+        run is applied (a single call when nothing changed); otherwise, or if
+        the token has expired, everything is re-listed and a fresh token saved.
+        """
+        token = self.uploader.store.get_meta(CHANGES_TOKEN_KEY)
+        if token:
+            try:
+                self._incremental_sync(token, progress)
+                return True
+            except errors.HttpError as e:
+                print("Drive change feed unavailable, doing a full sync:", e)
+
+        token = self.uploader.get_changes_token()
+        self._do_sync(progress)
+        rows = self._rebuild_csv_rows()
+        self._rewrite_logs(keep={r["topic"] for r in rows})
+        self.uploader.store.set_meta(CHANGES_TOKEN_KEY, token)
+        return True
 
-        # 4) sync local cache (delete any dirs not on Drive, redownload missing)
-        self._do_sync()
+    def _incremental_sync(self, token, progress=None):
+        changes, new_token = self.uploader.list_changes(token)
+        if changes:
+            rows = self.uploader.read_csv()
+            base = [dict(r) for r in rows]
+            before = {r["drive_folder_id"]: r["topic"] for r in rows if r.get("drive_folder_id")}
+            if self._apply_drive_changes(rows, changes, progress):
+                # Only what Drive changed; the window may be editing meanwhile
+                self.uploader.write_csv(rows, base)
+            after = {r["drive_folder_id"]: r["topic"] for r in rows if r.get("drive_folder_id")}
+            renamed = {t: after[f] for f, t in before.items() if f in after and after[f] != t}
+            if renamed or set(before) - set(after):
+                self._rewrite_logs(keep=set(after.values()) | set(renamed), renamed=renamed)
+        self.uploader.store.set_meta(CHANGES_TOKEN_KEY, new_token)
+
+    def _apply_drive_changes(self, rows, changes, progress=None):
+        """
+        Apply Drive change records to CSV rows (in place) and to local_records/.
+        Returns True if any row changed.
+        """
+        folder_mime = "application/vnd.google-apps.folder"
+        root = self.uploader.root_id
+        by_folder = {r["drive_folder_id"]: r for r in rows if r.get("drive_folder_id")}
+        owner = {}
+        for r in rows:
+            for f in json.loads(r.get("files") or "[]"):
+                owner[f["id"]] = r
+        LOCAL_CACHE.mkdir(exist_ok=True)
+        changed = False
+        jobs = []
+
+        # Folders first, so files landing in a brand-new topic find its row
+        changes = sorted(changes, key=lambda c: (c.get("file") or {}).get("mimeType") != folder_mime)
+        for ch in changes:
+            fid = ch["fileId"]
+            meta = ch.get("file") or {}
+            gone = ch.get("removed") or meta.get("trashed")
+            parents = meta.get("parents", [])
+
+            # ── Topic folders ────────────────────────────────────────────
+            if fid in by_folder or (meta.get("mimeType") == folder_mime and root in parents):
+                row = by_folder.get(fid)
+                if gone or root not in parents or meta.get("name") == RECORDS_FOLDER_NAME:
+                    if row is not None:
+                        rows.remove(row)
+                        del by_folder[fid]
+                        shutil.rmtree(LOCAL_CACHE / row["topic"], ignore_errors=True)
+                        self.manifest.forget_under(LOCAL_CACHE / row["topic"])
+                        changed = True
+                    continue
+                if row is None:
+                    row = {
+                        "topic": meta["name"], "files": "[]", "last_review": "",
+                        "next_review": datetime.utcnow().date().isoformat(),
+                        "calendar_event_id": "", "drive_folder_id": fid,
+                    }
+                    rows.append(row)
+                    by_folder[fid] = row
+                    changed = True
+                elif row["topic"] != meta["name"]:
+                    self._move_topic_dir(LOCAL_CACHE / row["topic"], LOCAL_CACHE / meta["name"])
+                    row["topic"] = meta["name"]
+                    changed = True
+                continue
+
+            # ── Files inside topic folders ───────────────────────────────
+            target = None if gone else next((by_folder[p] for p in parents if p in by_folder), None)
+            prev = owner.pop(fid, None)
+            if prev is not None and prev is not target:
+                flist = json.loads(prev.get("files") or "[]")
+                for f in flist:
+                    if f["id"] == fid:
+                        (LOCAL_CACHE / prev["topic"] / f["name"]).unlink(missing_ok=True)
+                        self.manifest.forget(fid)
+                prev["files"] = json.dumps([f for f in flist if f["id"] != fid])
+                changed = True
+            if target is None:
+                continue
+
+            owner[fid] = target
+            topic_dir = LOCAL_CACHE / target["topic"]
+            flist = json.loads(target.get("files") or "[]")
+            entry = next((f for f in flist if f["id"] == fid), None)
+            if entry is None:
+                flist.append({
+                    "id": fid,
+                    "name": meta["name"],
+                    "link": f"https://drive.google.com/uc?export=download&id={fid}"
+                })
+                changed = True
+            elif entry["name"] != meta["name"]:
+                # the download engine moves the cached copy to the new name
+                entry["name"] = meta["name"]
+                changed = True
+            target["files"] = json.dumps(flist)
+            jobs.append((fid, str(topic_dir / meta["name"]), meta))
+        try:
+            self._mirror(jobs, progress)
+        except OSError as e:
+            # The rows still take the change (and the feed moves past it);
+            # files missing locally are fetched on the next load
+            print("Could not update local_records/:", e)
+        self.manifest.save()
+        return changed
+
+    def _move_topic_dir(self, old_dir, new_dir):
+        """
+        Follow a topic rename in local_records/. If the new name is taken
+        (e.g. two topics swapped names) the old copy is dropped instead and
+        its files are fetched again under the new name.
+        """
+        if not old_dir.exists():
+            return
+        try:
+            old_dir.rename(new_dir)
+            self.manifest.rebase(old_dir, new_dir)
+        except OSError as e:
+            print(f"Could not move {old_dir} to {new_dir}, refetching:", e)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self.manifest.forget_under(old_dir)
+
+    def _rewrite_logs(self, keep, renamed=None):
+        """Drop study-log entries for topics not in `keep`; apply topic renames."""
+        renamed = renamed or {}
+        log_rows = self.uploader.read_log()
+        new_rows = []
+        for row in log_rows:
+            if row["topic"] not in keep:
+                continue
+            if row["topic"] in renamed:
+                row = dict(row, topic=renamed[row["topic"]])
+            new_rows.append(row)
+        if new_rows != log_rows:
+            self.uploader.write_log(new_rows)
 
     def _init_ui(self):
         # — Table —
-        self.table = QTableWidget()
+        self.thumbs = ThumbnailCache(self.manifest, self.pool, self)
+        self.model = ReviewTableModel(self, self.thumbs)
+        self.thumbs.ready.connect(lambda _: self.model.refresh())
+        self.task_label = QLabel()
+        self.statusBar().addPermanentWidget(self.task_label)
+        self.pool.changed.connect(self._show_tasks)
+        self.model.nextReviewEdited.connect(self.next_review_changed)
+        self.proxy = SearchProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(SORT_ROLE)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setItemDelegateForColumn(3, DateDelegate(self.table))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(
+            QAbstractItemView.EditTrigger.DoubleClicked
+            | QAbstractItemView.EditTrigger.SelectedClicked
+            | QAbstractItemView.EditTrigger.EditKeyPressed
+        )
+        self.table.horizontalHeader().setSortIndicatorShown(True)
         self.table.horizontalHeader().sectionClicked.connect(self.handle_header_clicked)
         self.table.selectionModel().currentRowChanged.connect(self.on_selection_changed)
 
@@ -390,6 +3172,14 @@ class ReviewApp(QMainWindow):
         self.search_bar    = QLineEdit()
         self.search_bar.setPlaceholderText("Search…")
         self.search_bar.textChanged.connect(self.on_search)
+        self.search = SearchIndex()
+        self.pdf_search_btn = QPushButton("Search PDFs")
+        self.pdf_search_btn.clicked.connect(self.search_pdfs)
+        self.fulltext = PdfTextIndex()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self._run_search)
 
         self.add_btn       = QPushButton("Add Topic")
         self.add_btn.clicked.connect(self.add_topic)
@@ -422,6 +3212,7 @@ class ReviewApp(QMainWindow):
             top.addWidget(w)
         top.addStretch()
         top.addWidget(self.search_bar)
+        top.addWidget(self.pdf_search_btn)
 
         splitter = QSplitter(Qt.Orientation.Horizontal)
 
@@ -432,8 +3223,10 @@ class ReviewApp(QMainWindow):
 
         # Define log_label and log_view
         self.log_label = QLabel("Last Note:")
-        self.log_view = QTextEdit()
-        self.log_view.setReadOnly(True)
+        self.log_model = LogListModel(self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setWordWrap(True)
 
         llay.addWidget(self.log_label)
         llay.addWidget(self.log_view)
@@ -468,15 +3261,15 @@ class ReviewApp(QMainWindow):
         self.placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
         rlay.addWidget(self.placeholder)
 
-        # PDF viewer setup
-        self.pdf = QWebEngineView()
-
-        # Enable local file access for the PDF viewer
-        s = self.pdf.settings()
-        s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
-        s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+        # PDF viewer: created by _viewer() on first open, so the web engine
+        # doesn't start until a PDF is actually shown
+        self.pdf = None
+        self.viewer_layout = rlay
+        self._viewer_ready = False
+        self._viewer_file = None
+        self._pending_open = None   # JS to run once viewer.html has loaded
+        self._view_states = OrderedDict()   # pdf url -> {"page", "scale"}
 
-        rlay.addWidget(self.pdf)
         splitter.addWidget(right)
 
         splitter.setStretchFactor(0, 1)
@@ -494,18 +3287,22 @@ class ReviewApp(QMainWindow):
         if (state := self.settings.value("splitterState")) is not None:
             self.splitter.restoreState(state)
 
-    def _sync_csv_with_drive(self):
+    def _rebuild_csv_rows(self):
+        """Rebuild review_log.csv from a full listing of the topic folders."""
         # 1) Load the existing CSV into a dict by topic
-        old_rows = {r["topic"]: r for r in self.uploader.read_csv()}
+        base = self.uploader.read_csv()
+        old_rows = {r["topic"]: r for r in base}
 
-        # 2) Fetch all topic folders on Drive
+        # 2) Fetch all topic folders on Drive, and their files in bulk
         new_rows = []
-        for fld in self.uploader.list_topic_folders():
+        folders = self.uploader.list_topic_folders()
+        index = self.uploader.list_files_in_folders(f["id"] for f in folders)
+        for fld in folders:
             topic = fld["name"]
             fld_id = fld["id"]
 
             # 3) Drive’s current listing
-            drive_files = self.uploader.list_files_in_folder(fld_id)
+            drive_files = index[fld_id]
             drive_meta = {
                 f["name"]: {
                     "id":   f["id"],
@@ -535,10 +3332,10 @@ class ReviewApp(QMainWindow):
                 "drive_folder_id":   fld_id,
             })
 
-        # 6) Overwrite the CSV on Drive and refresh the UI
-        self.uploader.write_csv(new_rows)
-        self._load_data()
-
+        # 6) Overwrite the CSV (pushed to Drive on the next flush), leaving
+        #    edits made in the window since step 1 alone
+        self.uploader.write_csv(new_rows, base)
+        return new_rows
 
 
     def sync_local_cache(self):
@@ -548,16 +3345,17 @@ class ReviewApp(QMainWindow):
         pd.setCancelButton(None)
         pd.show()
 
-        w = Worker(self._do_sync)
-        # When the sync finishes, close dialog AND update the CSV to match current Drive folders
-        w.signals.finished.connect(lambda _: (pd.close(), self._sync_csv_with_drive()))
+        w = Worker(self._sync_changes, progress=True)
+        w.signals.progress.connect(lambda p: self._show_download_progress(pd, p))
+        # When the sync finishes, close dialog AND reload the (now updated) CSV
+        w.signals.finished.connect(lambda _: (pd.close(), self._load_data()))
         w.signals.error.connect(lambda m: (
             pd.close(),
             QMessageBox.critical(self, "Sync Error", m)
         ))
-        self.pool.start(w)
+        self.pool.start(w, group="mirror")
 
-    def _do_sync(self):
+    def _do_sync(self, progress=None):
         # 1) fetch all topic folders on Drive
         topics = self.uploader.list_topic_folders()
         drive_map = {t["name"]: t["id"] for t in topics}
@@ -569,20 +3367,82 @@ class ReviewApp(QMainWindow):
         for d in LOCAL_CACHE.iterdir():
             if d.is_dir() and d.name not in drive_map:
                 shutil.rmtree(d)
+                self.manifest.forget_under(d)
 
-        # 3) for each Drive folder, download missing files
+        # 3) for each Drive folder, queue its files for revalidation
+        index = self.uploader.list_files_in_folders(drive_map.values())
+        jobs = []
         for name, fid in drive_map.items():
             topic_dir = LOCAL_CACHE / name
             topic_dir.mkdir(exist_ok=True)
 
-            # list all files in that Drive folder
-            flist = self.uploader.list_files_in_folder(fid)
+            # all files in that Drive folder, from the bulk listing
+            flist = index[fid]
             for f in flist:
-                local_path = topic_dir / f["name"]
-                if not local_path.exists():
-                    self.uploader.download_file_to_path(f["id"], str(local_path))
+                jobs.append((f["id"], str(topic_dir / f["name"]), f))
 
+        # 4) fetch whatever changed, in parallel
+        self._mirror(jobs, progress)
         return True
+
+    def _protected_file_ids(self, rows=None):
+        """Files of topics due within CACHE_PROTECT_DAYS; never evicted."""
+        horizon = (datetime.utcnow().date() + timedelta(days=CACHE_PROTECT_DAYS)).toordinal()
+        return {
+            f.id
+            for ent in list(self.full_data if rows is None else rows)
+            if ent.next_review <= horizon
+            for f in ent.files
+        }
+
+    def _mirror(self, jobs, progress=None):
+        """Download mirror jobs that fit the cache budget, then trim the cache."""
+        protected = self._protected_file_ids()
+        jobs = self.cache.select(self.downloads.sized(self.downloads.pending(jobs)), protected)
+        missing = self.downloads.run(jobs, progress)
+        self.cache.enforce(protected)
+        return missing
+
+    def _show_download_progress(self, pd, p):
+        pd.setMaximum(p["files_total"])
+        pd.setValue(p["files_done"])
+        pd.setLabelText(
+            f"Downloading {p['files_done']}/{p['files_total']} files "
+            f"({p['bytes_done'] / 2**20:.1f} MB, {p['rate'] / 2**20:.1f} MB/s)…"
+        )
+
+    def _download_missing(self, jobs):
+        """Fetch `jobs` in the background; drop files Drive no longer has."""
+        pd = QProgressDialog("Downloading…", None, 0, len(jobs), self)
+        pd.setWindowModality(Qt.WindowModality.WindowModal)
+        pd.setCancelButton(None)
+        pd.show()
+
+        def done(missing):
+            pd.close()
+            self._prefetch_due()
+            self._index_pdfs()
+            if not missing:
+                return
+            gone = set(missing)
+            edited = []
+            for ent in self.full_data:
+                kept = tuple(f for f in ent.files if f.id not in gone)
+                for f in ent.files:
+                    if f.id in gone:
+                        print(f"Warning: Skipping missing file {f.name} (ID: {f.id})")
+                if len(kept) != len(ent.files):
+                    ent.files = kept
+                    edited.append(ent)
+                    self._reindex(ent)
+            self._save_bg(*edited)
+            self.model.refresh()
+
+        w = Worker(self._mirror, jobs, progress=True)
+        w.signals.progress.connect(lambda p: self._show_download_progress(pd, p))
+        w.signals.finished.connect(done)
+        w.signals.error.connect(lambda m: (pd.close(), QMessageBox.critical(self, "Download Error", m)))
+        self.pool.start(w, group="mirror")
     
     def _restore_ui_settings(self):
         if geom := self.settings.value("geometry"):
@@ -592,6 +3452,14 @@ class ReviewApp(QMainWindow):
         if hs := self.settings.value("headerState"):
             self.table.horizontalHeader().restoreState(hs)
 
+    def _show_tasks(self, m):
+        queued = sum(m[lane] for lane in TaskQueue.LANES)
+        if not (m["running"] or queued):
+            self.task_label.clear()
+            return
+        lanes = ", ".join(f"{m[lane]} {lane}" for lane in TaskQueue.LANES if m[lane])
+        self.task_label.setText(f"{m['running']} running · {queued} queued" + (f" ({lanes})" if lanes else ""))
+
     def _on_viewer_loaded(self, ok):
         # once the HTML is loaded, keep it hidden until first PDF open
         # you could also disable the placeholder here if you like.
@@ -602,112 +3470,228 @@ class ReviewApp(QMainWindow):
         self.settings.setValue("windowState", self.saveState())
         self.settings.setValue("headerState", self.table.horizontalHeader().saveState())
         self.settings.setValue("splitterState", self.splitter.saveState())
+
+        # Stop downloads first so the mirror tasks end instead of being awaited
+        self.flush_timer.stop()
+        self.downloads.close()
+        self.pool.cancel("mirror")
+        self.pool.shutdown()
+
+        # Push any edits still waiting in the local mirror
+        self.streams.discard()
+        self.manifest.save()
+        try:
+            self._on_drained(self._drain())
+        except Exception as err:
+            print("Could not push pending changes, kept locally:", err)
         super().closeEvent(e)
 
     def _set_ui_enabled(self, en):
         for w in (
-            self.table, self.search_bar,
+            self.table, self.search_bar, self.pdf_search_btn,
             self.add_btn, self.remove_btn, self.dashboard_btn,
             self.open_btn, self.upload_btn, self.settings_btn, self.review_btn,
             self.close_btn
         ):
             w.setEnabled(en)
 
-    def _load_data(self):
-        pd = QProgressDialog("Loading…", None, 0, 0, self)
-        pd.setWindowModality(Qt.WindowModality.WindowModal)
-        pd.setCancelButton(None)
-        pd.show()
-        w = Worker(self.uploader.read_csv)
-        w.signals.finished.connect(lambda rows, pd=pd: self._on_loaded(rows, pd))
+    def _load_data(self, startup=False):
+        """
+        Read rows and log from Drive in the background. With rows already on
+        screen the result is applied as a diff; otherwise a dialog waits.
+        """
+        pd = None
+        if self.full_data:
+            self.statusBar().showMessage("Syncing with Drive…")
+        else:
+            pd = QProgressDialog("Loading…", None, 0, 0, self)
+            pd.setWindowModality(Qt.WindowModality.WindowModal)
+            pd.setCancelButton(None)
+            pd.show()
+        w = Worker(self._startup_sync if startup else self._read_rows)
+        w.signals.finished.connect(lambda res, pd=pd: self._on_loaded(*res, pd))
         w.signals.error.connect(lambda m, pd=pd: self._on_load_err(m, pd))
-        self.pool.start(w)
+        self.pool.start(w, OPEN_PRIORITY, key="load", group="mirror")
 
-    # filepath: c:\Users\Guido\Desktop\Learning app\app.py
-    def _on_loaded(self, rows, pd):
-        pd.close()
-        self.full_data = rows
-        self.data = list(rows)
-        self.logs = self.uploader.read_log()
+    def _read_rows(self):
+        """Rows, study log and the cache jobs they need, read off the GUI thread."""
+        rows = [ReviewRow.from_csv(r) for r in self.uploader.read_csv()]
+        version = self.uploader.store.version
+        log_seq = self.uploader.store.journal_seq()
+        logs = LogIndex(self.uploader.read_log() + self.uploader.store.pending_logs(log_seq))
 
-        # Sync Drive files into local cache
+        # Queue Drive files whose cached copy is missing or unverified
         LOCAL_CACHE.mkdir(exist_ok=True)
-        for ent in self.full_data:
-            topic_dir = LOCAL_CACHE / ent["topic"]
+        jobs = []
+        for ent in rows:
+            topic_dir = LOCAL_CACHE / ent.topic
             topic_dir.mkdir(exist_ok=True)
-            flist = json.loads(ent.get("files") or "[]")
-            valid_files = []
-            for f in flist:
-                local_path = topic_dir / f["name"]
-                try:
-                    if not local_path.exists():
-                        self.uploader.download_file_to_path(f["id"], str(local_path))
-                    valid_files.append(f)
-                except googleapiclient.errors.HttpError as e:
-                    if e.resp.status == 404:
-                        print(f"Warning: Skipping missing file {f['name']} (ID: {f['id']})")
-                    else:
-                        raise
-            ent["files"] = json.dumps(valid_files)
-
-        # Calendar sync
-        today = QDate.currentDate()
-        for ent in self.full_data:
-            nr = ent.get("next_review", "")
-            qnr = QDate.fromString(nr, "yyyy-MM-dd")
-            if not qnr.isValid():
-                ent["calendar_event_id"] = ""
-            elif qnr > today:
-                # Only schedule if next_review is in the future
-                self.calendar.delete_future_events(ent["topic"])
-                eid = self.calendar.create_event(ent["topic"], nr)
-                ent["calendar_event_id"] = eid or ""
-            else:
-                # Past or today → mark expired and don’t schedule
-                ent["calendar_event_id"] = ""
-                ent["_expired"] = True
+            for f in ent.files:
+                jobs.append((f.id, str(topic_dir / f.name), None))
+        jobs = self.cache.select(self.downloads.sized(self.downloads.pending(jobs)),
+                                 self._protected_file_ids(rows))
+        # Warm overdue and due-today topics first
+        due = {f.id: ent.next_review for ent in rows for f in ent.files}
+        jobs.sort(key=lambda j: due.get(j[0], 0))
+        return rows, logs, jobs, version, log_seq
+
+    # filepath: c:\Users\Guido\Desktop\Learning app\app.py
+    def _on_loaded(self, rows, logs, jobs, version, log_seq, pd):
+        if pd is not None:
+            pd.close()
+        self.statusBar().clearMessage()
+        if self.uploader.store.version != version:
+            # Edited while the worker read; the mirror has both sides merged
+            rows = [ReviewRow.from_csv(r) for r in self.uploader.store.rows()]
+        # Likewise reviews logged after the worker read the log
+        for seq, entry in self._logged:
+            if seq > log_seq:
+                logs.add(entry)
+        self._logged = []
+        self.logs = logs
+        self._apply_rows(rows)
+        self.load.rebuild(self.full_data)
+
+        # Fitted schedulers re-plan topics whose log changed since the last
+        # plan; the calendar is reconciled once the dates are final
+        if self.scheduler.batch:
+            marks = {t: self._log_mark(items) for t, items in self.logs.by_topic.items()}
+            w = Worker(self._replan, self.logs.by_topic)
+            w.signals.finished.connect(lambda plan: self._on_replanned(plan, marks))
+            w.signals.error.connect(lambda m: (print("Rescheduling failed:", m), self._reconcile_calendar()))
+            self.pool.start(w)
+        else:
+            self._reconcile_calendar()
+
         self._save_bg()
         self._set_ui_enabled(True)
-        self.populate_table()
 
         # Now that everything’s ready, show the window
         self.show()
+        STARTUP.since_start("first sync")
+        QTimer.singleShot(0, lambda: (STARTUP.since_start("first paint"), STARTUP.report()))
+        self._run_reopen()
+        if jobs:
+            self._download_missing(jobs)
+        else:
+            self._prefetch_due()
+            self._index_pdfs()
+
+    def _apply_rows(self, rows):
+        """
+        Bring the visible table in line with `rows`, updating rows in place
+        (selection and open file survive) instead of resetting the model.
+        """
+        if not self.model.rows:
+            self.full_data = rows
+            self.populate_table()
+            return
+        key = lambda e: LocalStore.row_key(e.to_csv())
+        current = {key(e): e for e in self.model.rows}
+        incoming = {key(e) for e in rows}
+        for ent in [e for e in self.model.rows if key(e) not in incoming]:
+            self.model.remove_row(ent)
+        for new in rows:
+            ent = current.get(key(new))
+            if ent is None:
+                self.model.append_row(new)
+                continue
+            ent.key = new.key
+            if any(getattr(ent, f) != getattr(new, f) for f in REVIEW_FIELDS):
+                for f in REVIEW_FIELDS:
+                    setattr(ent, f, getattr(new, f))
+                self.model.row_changed(ent)
+        self.full_data = self.model.rows
+        self.search.rebuild(self.full_data, self.logs)
+        self._run_search()
+        if self.log_model.topic is not None:
+            self.log_model.set_topic(self.log_model.topic, self.logs.entries(self.log_model.topic))
+
+    def _reconcile_calendar(self):
+        """Reconcile future topics against the calendar in one background pass."""
+        w = Worker(self.calendar.reconcile, list(self.full_data))
+        w.signals.finished.connect(self._on_calendar_reconciled)
+        w.signals.error.connect(lambda m: print("Calendar sync failed:", m))
+        self.pool.start(w, key="calendar")
+
+    def _replan(self, by_topic):
+        frame = log_frame(by_topic)
+        self.scheduler.fit(frame)
+        return self.scheduler.replay(frame)
+
+    def _log_mark(self, items):
+        """What a topic's plan was made from: scheduler, review count and last review date."""
+        return f"{self.scheduler.name}:{len(items)}:{items[-1][0]}" if items else ""
+
+    def _on_replanned(self, plan, marks):
+        """
+        Apply `plan` to the topics whose log `marks` differ from those of the
+        last plan; the rest keep their dates, including ones picked by hand.
+        """
+        today = date.today().toordinal()
+        store = self.uploader.store
+        planned = json.loads(store.get_meta("plan_marks", "{}"))
+        moves = sorted(
+            ((plan[ent.topic], i, ent) for i, ent in enumerate(self.full_data)
+             if plan.get(ent.topic) and marks.get(ent.topic) != planned.get(ent.topic)),
+            key=lambda m: m[:2]
+        )
+        if self.balance:
+            # Re-place every planned topic, earliest first, against the
+            # load of the topics that keep their dates
+            for _, _, ent in moves:
+                self.load.remove(ent.next_review)
+        changed = []
+        for nxt, _, ent in moves:
+            if self.balance:
+                if nxt > today:
+                    nxt = self.load.place(nxt, nxt - (ent.last_review or today), today + 1)
+                self.load.add(nxt)
+            elif nxt != ent.next_review:
+                self.load.move(ent.next_review, nxt)
+            if nxt != ent.next_review:
+                ent.next_review = nxt
+                changed.append(ent)
+        store.set_meta("plan_marks", json.dumps(marks))
+        if changed:
+            self._save_bg(*changed)
+            self.model.refresh()
+        self._reconcile_calendar()
+
+    def _on_calendar_reconciled(self, ids):
+        changed = []
+        for ent in self.full_data:
+            eid = ids.get(CalendarManager.topic_key(ent), "")
+            if eid != ent.calendar_event_id:
+                ent.calendar_event_id = eid
+                changed.append(ent)
+        self._save_bg(*changed)
 
     def open_file(self, r):
-        flist = json.loads(self.data[r].get("files") or "[]")
-        if not flist:
+        ent = self._entry(r)
+        if not ent.files:
             QMessageBox.information(self, "No Files", "No files added.")
             return
 
-        name, ok = QInputDialog.getItem(
-            self, "Choose File", "Select:", [f["name"] for f in flist], editable=False
-        )
-        if not ok:
+        dlg = FilePickerDialog(ent.files, self.thumbs, self)
+        if dlg.exec() != QDialog.DialogCode.Accepted or not (name := dlg.selected_name()):
             return
 
-        local = LOCAL_CACHE / self.data[r]["topic"] / name
-        if not local.exists():
-            fid = next(f["id"] for f in flist if f["name"] == name)
-            self.uploader.download_file_to_path(fid, str(local))
-
-        # Build the file URL
-        raw_path = local.resolve().as_posix()
-        enc_path = quote(raw_path, safe="/:")
-        pdf_url = f"file:///{enc_path}"
+        topic = ent.topic
+        local = LOCAL_CACHE / topic / name
+        fid = next(f.id for f in ent.files if f.name == name)
 
-        viewer_url = QUrl.fromLocalFile(str(PDFJS_VIEWER.resolve())).toString()
-        full_url = f"{viewer_url}?file={pdf_url}"
+        def show():
+            self._load_pdf(local)
 
-        self.pdf.hide()
-        self.pdf.loadFinished.connect(self._on_pdf_load_finished)
-        self.pdf.load(QUrl(full_url))
+            # After successfully showing the PDF
+            self.pdf.show()
 
-        # After successfully showing the PDF
-        self.pdf.show()
+            # Remember for next launch
+            self.settings.setValue("last_topic", topic)
+            self.settings.setValue("last_file", name)
 
-        # Remember for next launch
-        self.settings.setValue("last_topic", self.data[r]["topic"])
-        self.settings.setValue("last_file", name)
+        self._ensure_cached(fid, local, show)
 
     def _restore_last_opened(self):
         t = self.settings.value("last_topic", "")
@@ -715,86 +3699,247 @@ class ReviewApp(QMainWindow):
         if not t or not f:
             return
 
-        # defer until after data is loaded
-        def try_open(_):
+        # defer until the first rows are on screen (snapshot or first load)
+        def try_open():
             # find the row for that topic
-            for i, ent in enumerate(self.full_data):
-                if ent["topic"] == t:
+            for ent in self.full_data:
+                if ent.topic == t:
                     # manually invoke open with that file name
-                    self._open_file_by_name(i, f)
+                    self._open_file_by_name(ent, f)
                     break
 
-        # hook into your existing load signal
-        QTimer.singleShot(0, lambda: None)  # ensure UI ready
-        self._on_loaded = (lambda orig:
-            lambda rows, pd: (orig(rows, pd), try_open(rows))
-        )(self._on_loaded)
+        self._reopen = try_open
 
-    def _open_file_by_name(self, row, filename):
-        topic = self.data[row]["topic"]
-        local = LOCAL_CACHE / topic / filename
-        if not local.exists():
-            fid = next(
-                f["id"] for f in json.loads(self.data[row]["files"])
-                if f["name"] == filename
-            )
-            self.uploader.download_file_to_path(fid, str(local))
+    def _run_reopen(self):
+        if self._reopen:
+            self._reopen, try_open = None, self._reopen
+            try_open()
 
-        # Build the file URL
-        raw_path = local.resolve().as_posix()
-        enc_path = quote(raw_path, safe="/:")
-        pdf_url = f"file:///{enc_path}"
+    def _open_file_by_name(self, ent, filename, page=None):
+        topic = ent.topic
+        local = LOCAL_CACHE / topic / filename
+        fid = next((f.id for f in ent.files if f.name == filename), None)
+        if fid is None:
+            return
 
-        viewer_url = QUrl.fromLocalFile(str(PDFJS_VIEWER.resolve())).toString()
-        full_url = f"{viewer_url}?file={pdf_url}"
+        def show():
+            self._load_pdf(local, page)
 
-        self.pdf.hide()
-        self.pdf.loadFinished.connect(self._on_pdf_load_finished)
-        self.pdf.load(QUrl(full_url))
+            # Show the filename in the label
+            self.file_label.setText(filename)
 
-        # Show the filename in the label
-        self.file_label.setText(filename)
+        self._ensure_cached(fid, local, show)
 
     def _open_file_by_index(self, row, index):
-        topic = self.data[row]["topic"]
-        flist = json.loads(self.data[row].get("files") or "[]")
+        ent = self._entry(row)
+        topic = ent.topic
+        flist = ent.files
         if not flist:
             return
 
         index %= len(flist)  # wrap-around
         file_info = flist[index]
-        filename = file_info["name"]
+        filename = file_info.name
         local = LOCAL_CACHE / topic / filename
 
-        if not local.exists():
-            self.uploader.download_file_to_path(file_info["id"], str(local))
+        def show():
+            self._load_pdf(local)
+            self.pdf.show()
+
+            self.file_label.setText(filename)
+            # Persist last opened file/topic
+            self.settings.setValue("last_topic", topic)
+            self.settings.setValue("last_file", filename)
 
+        self._ensure_cached(file_info.id, local, show)
+        self._prefetch_around(row, index)
+
+    def _load_pdf(self, local, page=None):
+        """
+        Show `local` in the viewer. viewer.html is only loaded for the first
+        document; later ones are swapped in place and reopen at the page and
+        zoom they were left at.
+        """
         # Build the file URL
         raw_path = local.resolve().as_posix()
         enc_path = quote(raw_path, safe="/:")
         pdf_url = f"file:///{enc_path}"
 
+        self._remember_view()
+        state = dict(self._view_states.get(pdf_url, {}))
+        if page:
+            state["page"] = page
+        self._viewer_file = pdf_url
+
+        # Not cached yet: let pdf.js pull byte ranges as it needs them
+        stream = self.streams.pending(str(local))
+        if stream:
+            stream = {"src": f"{STREAM_SCHEME.decode()}://file/{stream[0]}", "length": stream[1]}
+        js = VIEWER_OPEN_JS % (
+            json.dumps(pdf_url), json.dumps(stream),
+            json.dumps(state.get("page")), json.dumps(state.get("scale"))
+        )
+
+        if self._viewer_ready:
+            self.pdf.page().runJavaScript(js)
+            self.placeholder.hide()
+            self.pdf.show()
+            return
+
         viewer_url = QUrl.fromLocalFile(str(PDFJS_VIEWER.resolve())).toString()
-        full_url = f"{viewer_url}?file={pdf_url}"
+        if stream:
+            full_url = f"{viewer_url}?file="
+            self._pending_open = js
+        else:
+            full_url = f"{viewer_url}?file={pdf_url}"
+            if state.get("page"):
+                full_url += f"#page={state['page']}"
+            self._pending_open = None
 
-        self.pdf.hide()
-        self.pdf.loadFinished.connect(self._on_pdf_load_finished)
+        self._viewer().hide()
         self.pdf.load(QUrl(full_url))
-        self.pdf.show()
 
-        self.file_label.setText(filename)
-        # Persist last opened file/topic
-        self.settings.setValue("last_topic", topic)
-        self.settings.setValue("last_file", filename)
+    def _viewer(self):
+        if self.pdf is None:
+            self.pdf = QWebEngineView()
+
+            # Enable local file access for the PDF viewer
+            s = self.pdf.settings()
+            s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
+            s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+            self.pdf.loadFinished.connect(self._on_pdf_load_finished)
+            self.stream_handler = StreamSchemeHandler(self.streams, self.pool, self)
+            self.pdf.page().profile().installUrlSchemeHandler(STREAM_SCHEME, self.stream_handler)
+            self.pdf.hide()
+            self.viewer_layout.addWidget(self.pdf)
+        return self.pdf
+
+    def _remember_view(self):
+        """Capture page/zoom of the document being replaced."""
+        if not (self._viewer_ready and self._viewer_file):
+            return
+
+        def store(state, key=self._viewer_file):
+            if not state:
+                return
+            self._view_states[key] = state
+            self._view_states.move_to_end(key)
+            while len(self._view_states) > VIEW_STATE_LIMIT:
+                self._view_states.popitem(last=False)
+
+        self.pdf.page().runJavaScript(VIEWER_STATE_JS, store)
 
-    def _on_pdf_load_finished(self, ok: bool):
+    def _ensure_cached(self, file_id, local, then):
         """
-        Slot for QWebEngineView.loadFinished.
-        Only show the PDF view once it's actually rendered to avoid flicker.
+        Call `then()` once `local` holds the current copy of `file_id`. A cache
+        hit runs it immediately; a miss downloads in the background first, and
+        is cancelled if another file is opened in the meantime.
         """
-        # disconnect immediately so it only fires once
-        self.pdf.loadFinished.disconnect(self._on_pdf_load_finished)
+        self.pool.cancel("open")
+
+        def ready(_=None):
+            self.cache.touch(file_id)
+            self.cache.enforce(self._protected_file_ids() | {file_id})
+            then()
+
+        if self.manifest.check(file_id, str(local)) == "ok":
+            ready()
+            return
+
+        def download(_=None):
+            self.file_label.setText(f"Downloading {local.name}…")
+            w = Worker(self.downloads.run, [(file_id, str(local), None)])
+            w.signals.finished.connect(ready)
+            w.signals.error.connect(lambda m: QMessageBox.critical(self, "Download Error", m))
+            self.pool.start(w, OPEN_PRIORITY, group="open")
+
+        if local.suffix.lower() != ".pdf":
+            download()
+            return
+
+        # PDFs open straight away and fill the cache as pdf.js reads them
+        self.file_label.setText(f"Streaming {local.name}…")
+        w = Worker(self.streams.open, file_id, str(local))
+        w.signals.finished.connect(ready)
+        w.signals.error.connect(download)
+        self.pool.start(w, OPEN_PRIORITY, group="open")
+
+    def _file_jobs(self, ent, indexes=None):
+        flist = ent.files
+        if indexes is not None:
+            flist = [flist[i % len(flist)] for i in indexes] if flist else []
+        return [(f.id, str(LOCAL_CACHE / ent.topic / f.name), None) for f in flist]
+
+    def _prefetch_around(self, row, index):
+        """Warm the neighbours of the open file: prev/next file, next rows."""
+        jobs = self._file_jobs(self._entry(row), (index + 1, index - 1))
+        for r in range(row + 1, min(row + 1 + PREFETCH_ROWS, self.proxy.rowCount())):
+            jobs += self._file_jobs(self._entry(r), (0,))
+        self.prefetcher.push(jobs, urgent=True)
+
+    def _index_pdfs(self):
+        """Extract text from new or changed cached PDFs in the background."""
+        files, ids = [], set()
+        for ent in self.full_data:
+            for f in ent.files:
+                ids.add(f.id)
+                m = self.manifest.get(f.id)
+                if m and f.name.lower().endswith(".pdf") and Path(m["path"]).exists():
+                    files.append((f.id, m["md5"], m["path"], ent.topic, f.name))
+
+        def run():
+            self.fulltext.prune(ids)
+            return self.fulltext.update(files)
+
+        # One pass at a time; a call while it runs is dropped
+        w = Worker(run)
+        w.signals.error.connect(lambda m: print("PDF indexing failed:", m))
+        self.pool.start(w, INDEX_PRIORITY, key="fulltext")
+
+    def search_pdfs(self):
+        text = self.search_bar.text().strip()
+        if not text:
+            text, ok = QInputDialog.getText(self, "Search PDFs", "Find in notes:")
+            if not ok or not text.strip():
+                return
+        hits = self.fulltext.search(text)
+        if not hits:
+            QMessageBox.information(self, "Search PDFs", "No matching pages.")
+            return
+        dlg = PdfSearchDialog(hits, self)
+        if dlg.exec() != QDialog.DialogCode.Accepted or not (hit := dlg.selected_hit()):
+            return
+        _, topic, name, page, _ = hit
+        ent = next((e for e in self.full_data if e.topic == topic), None)
+        if ent is not None:
+            self._open_file_by_name(ent, name, page)
+
+    def _prefetch_due(self):
+        """Warm topics due within PREFETCH_DAYS, overdue and due-today first."""
+        horizon = (datetime.utcnow().date() + timedelta(days=PREFETCH_DAYS)).toordinal()
+        due = sorted(
+            (e for e in self.full_data if e.next_review <= horizon),
+            key=lambda e: e.next_review
+        )
+        jobs = [j for e in due for j in self._file_jobs(e)]
+        protected = self._protected_file_ids()
+
+        # Sizing the jobs takes Drive calls, so choose off the GUI thread
+        w = Worker(lambda: self.cache.select(self.downloads.sized(self.downloads.pending(jobs)), protected))
+        w.signals.finished.connect(self.prefetcher.push)
+        w.signals.error.connect(lambda m: print("Prefetch selection failed:", m))
+        self.pool.start(w, PREFETCH_PRIORITY, key="prefetch-due")
 
+    def _on_pdf_load_finished(self, ok: bool):
+        """
+        Slot for QWebEngineView.loadFinished (connected once; it only fires
+        when viewer.html itself loads). Only show the PDF view once it's
+        actually rendered to avoid flicker.
+        """
+        self._viewer_ready = ok
+        if ok and self._pending_open:
+            self.pdf.page().runJavaScript(self._pending_open)
+            self._pending_open = None
         if ok:
             self.placeholder.hide()
             self.pdf.show()
@@ -802,70 +3947,50 @@ class ReviewApp(QMainWindow):
             QMessageBox.critical(self, "Load Error", "Failed to load PDF.")
 
     def clear_pdf(self):
-        self.pdf.hide()
-        self.pdf.setUrl(QUrl())
+        # Keep viewer.html loaded; just close the document
+        self._remember_view()
+        self._viewer_file = None
+        if self._viewer_ready:
+            self.pdf.page().runJavaScript("window.PDFViewerApplication && PDFViewerApplication.close()")
+        if self.pdf is not None:
+            self.pdf.hide()
         self.placeholder.show()
 
     def _on_load_err(self, msg, pd):
+        if pd is None:
+            # The snapshot stays usable; edits wait in the journal
+            print("Drive sync failed, showing saved data:", msg)
+            STARTUP.report()
+            self.statusBar().showMessage("Offline – showing saved data")
+            return
         pd.close()
         QMessageBox.critical(self, "Error loading", msg)
         sys.exit(1)
 
     def on_search(self, txt):
-        t = txt.strip().lower()
-        self.data = (
-            self.full_data
-            if not t
-            else [r for r in self.full_data if t in r["topic"].lower()]
-        )
-        self.populate_table()
+        # Debounced: the query runs once typing pauses
+        self.search_timer.start()
 
-    def populate_table(self):
-        self.table.setUpdatesEnabled(False)
-        self.table.clear()
-        self.table.setColumnCount(4)
-        self.table.setRowCount(len(self.data))
-        self.table.setHorizontalHeaderLabels(
-            ["Topic", "Files", "Last Review", "Next Review"]
-        )
-        for r, e in enumerate(self.data):
-            # ── Topic and Files ────────────────────────────────────────────────
-            self.table.setItem(r, 0, QTableWidgetItem(e["topic"]))
-            flist = json.loads(e.get("files") or "[]")
-            self.table.setItem(r, 1, QTableWidgetItem(
-                ", ".join(f["name"] for f in flist)
-            ))
-
-            # ── Last Review (plain text, read‐only) ────────────────────────────
-            last = e.get("last_review", "")
-            itm_last = QTableWidgetItem(last)
-            itm_last.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-            self.table.setItem(r, 2, itm_last)
-
-            # ── Next Review / Expired ──────────────────────────────────────────
-            nr_str = e.get("next_review", "")
-            last_done = bool(e.get("last_review", "").strip())
-            # If never reviewed, show blank
-            if not last_done or not nr_str:
-                self.table.setItem(r, 3, QTableWidgetItem(""))
-            else:
-                qnr = QDate.fromString(nr_str, "yyyy-MM-dd")
-                # Expired?
-                if qnr.isValid() and qnr <= QDate.currentDate():
-                    itm = QTableWidgetItem("Expired")
-                    itm.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                    self.table.setItem(r, 3, itm)
-                else:
-                    # Allow date pick for scheduling
-                    ne = QDateEdit(qnr if qnr.isValid() else QDate.currentDate())
-                    ne.setCalendarPopup(True)
-                    ne.setDisplayFormat("yyyy-MM-dd")
-                    ne.dateChanged.connect(partial(self.next_review_changed, r))
-                    self.table.setCellWidget(r, 3, ne)
+    def _run_search(self):
+        matches = self.search.query(self.search_bar.text())
+        self.proxy.set_matches(matches, by_rank=not self.sort_states)
+
+    def _reindex(self, ent):
+        self.search.index_topic(ent)
+        if self.search_bar.text().strip():
+            self.search_timer.start()
 
+    def populate_table(self):
+        """Reload every row from full_data (after a full load or sync)."""
+        self.search.rebuild(self.full_data, self.logs)
+        self.model.set_rows(self.full_data)
+        self._run_search()
         self.table.resizeColumnsToContents()
-        self.table.setUpdatesEnabled(True)
-        
+
+    def _entry(self, r):
+        """ReviewRow shown at view row `r` (after sorting and filtering)."""
+        return self.model.rows[self.proxy.mapToSource(self.proxy.index(r, 0)).row()]
+
     def handle_header_clicked(self, col):
         if col not in (0, 2, 3):
             return
@@ -876,58 +4001,34 @@ class ReviewApp(QMainWindow):
             else Qt.SortOrder.AscendingOrder
         )
         self.sort_states[col] = order
-        if col == 0:
-            key = lambda e: e["topic"].lower()
-        elif col == 2:
-            key = lambda e: (
-                QDate.fromString(e.get("last_review", ""), "yyyy-MM-dd").toPyDate()
-                if QDate.fromString(e.get("last_review", ""), "yyyy-MM-dd").isValid()
-                else datetime(1970, 1, 1).date()
-            )
-        else:
-            key = lambda e: (
-                QDate.fromString(e.get("next_review", ""), "yyyy-MM-dd").toPyDate()
-                if QDate.fromString(e.get("next_review", ""), "yyyy-MM-dd").isValid()
-                else datetime(1970, 1, 1).date()
-            )
-        self.data.sort(key=key, reverse=(order == Qt.SortOrder.DescendingOrder))
-        self.populate_table()
+        self.proxy.by_rank = False
+        self.proxy.sort(col, order)
+        self.table.horizontalHeader().setSortIndicator(col, order)
 
     def on_selection_changed(self, current, prev):
         r = current.row()
         if r < 0:
-            self.log_view.clear()
+            self.log_model.set_topic(None, [])
             return
 
-        # ── Display logs for the selected topic ───────────────────────────────
-        topic = self.data[r]["topic"]
-        entries = [L for L in self.logs if L["topic"] == topic]
-        if not entries:
-            self.log_view.clear()
-        else:
-            # Sort chronologically and show all entries
-            entries.sort(key=lambda x: x["review_date"])
-            lines = [
-                f'{e["review_date"]} ({e["difficulty"]}): {e["comment"]}'
-                for e in entries
-            ]
-            self.log_view.setPlainText("\n".join(lines))
+        # ── Display logs for the selected topic (newest first, paged) ────────
+        ent = self._entry(r)
+        self.log_model.set_topic(ent.topic, self.logs.entries(ent.topic))
 
         # ── Open first file & reset nav state ─────────────────────────────────
-        flist = json.loads(self.data[r].get("files") or "[]")
-        if flist:
-            self.current_row = r
+        if ent.files:
+            self.current_index = QPersistentModelIndex(current)
             self.current_file_index = 0
             self._open_file_by_index(r, 0)
         else:
-            self.current_row = -1
+            self.current_index = QPersistentModelIndex()
 
     def _current(self):
-        r = self.table.currentRow()
+        r = self.table.currentIndex().row()
         if r < 0:
             QMessageBox.information(self, "No Selection", "Select a topic first.")
             return None, None
-        return r, self.data[r]
+        return r, self._entry(r)
 
     def open_selected(self):
         r, _ = self._current()
@@ -950,29 +4051,32 @@ class ReviewApp(QMainWindow):
             self.mark_reviewed(r)
 
     def last_review_changed(self, r, nd):
-        ent = self.data[r]
-        ent["last_review"] = nd.toString("yyyy-MM-dd")
-        self._save_bg()
-
-    def _reschedule(self, topic, ds):
-        self.calendar.delete_future_events(topic)
-        return self.calendar.create_event(topic, ds)
-
-    def next_review_changed(self, r, nd):
-        ent = self.data[r]
-        ds = nd.toString("yyyy-MM-dd")
-        ent["next_review"] = ds
-        ent["calendar_event_id"] = ""
-
-        # Persist the date change immediately
-        self.uploader.write_csv(self.full_data)
+        ent = self._entry(r)
+        ent.last_review = qdate_ordinal(nd)
+        self._save_bg(ent)
+        self.model.row_changed(ent)
+
+    def _journal_event(self, ent, ds):
+        """Queue the calendar change for `ent` (ds == "" removes its events)."""
+        key = CalendarManager.topic_key(ent)
+        self.uploader.store.enqueue("event", key, {"topic": ent.topic, "date": ds}, supersede=True)
+
+    def next_review_changed(self, ent, nd):
+        nxt = qdate_ordinal(nd)
+        if nxt == ent.next_review:
+            return
+        ds = ordinal_str(nxt)
+        self.load.move(ent.next_review, nxt)
+        ent.next_review = nxt
+        ent.calendar_event_id = ""
 
-        w = Worker(self._reschedule, ent["topic"], ds)
-        w.signals.finished.connect(lambda eid, e=ent: self._on_new_event(e, eid))
-        self.pool.start(w)
+        # Persist the date change locally; Drive and Calendar get it on the next flush
+        self._journal_event(ent, ds)
+        self._save_bg(ent)
+        self.model.row_changed(ent)
 
     def mark_reviewed(self, r):
-        ent = self.data[r]
+        ent = self._entry(r)
         opts = ["Difficult", "Medium", "Easy"]
         diff, ok = QInputDialog.getItem(self, "Reviewed", "How was this revision?", opts, editable=False)
         if not ok:
@@ -980,45 +4084,44 @@ class ReviewApp(QMainWindow):
         comment, ok2 = QInputDialog.getText(self, "Comment", "Add a note:")
         if not ok2:
             comment = ""
-        today = QDate.currentDate().toString("yyyy-MM-dd")
-        entry = {"topic": ent["topic"], "review_date": today, "difficulty": diff, "comment": comment}
-        self.uploader.append_log(entry)
-        self.logs.append(entry)
-
-        last = ent.get("last_review", "")
-        if not last:
-            mapping = {"Difficult": 1, "Medium": 3, "Easy": 7}
-            nxt_days = mapping[diff]
-        else:
-            d0 = QDate.fromString(last, "yyyy-MM-dd").toPyDate()
-            d1 = datetime.strptime(today, "%Y-%m-%d").date()
-            delta = max(1, (d1 - d0).days)
-            factor = {"Difficult": 1.2, "Medium": 1.5, "Easy": 2.0}[diff]
-            nxt_days = max(1, round(delta * factor))
-        nxt_date = QDate.currentDate().addDays(nxt_days).toString("yyyy-MM-dd")
-
-        ent["last_review"] = today
-        ent["next_review"] = nxt_date
-        ent["calendar_event_id"] = ""
-
-        # Write updated last/next review straight back to Drive
-        self.uploader.write_csv(self.full_data)
-        self.populate_table()
-
-        w = Worker(self._reschedule, ent["topic"], nxt_date)
-        w.signals.finished.connect(lambda eid, e=ent: self._on_new_event(e, eid))
-        self.pool.start(w)
-
-    def _on_new_event(self, ent, eid):
-        ent["calendar_event_id"] = eid or ""
-        self._save_bg()
+        today = date.today()
+        entry = {"topic": ent.topic, "review_date": today.isoformat(), "difficulty": diff, "comment": comment}
+        seq = self.uploader.store.enqueue("log", entry["topic"], entry)
+        self._logged.append((seq, entry))
+        self.logs.add(entry)
+        self.search.add_log(entry)
+        if self.log_model.topic == entry["topic"]:
+            self.log_model.set_topic(entry["topic"], self.logs.entries(entry["topic"]))
+
+        nxt = self.scheduler.next_review(ent, self.logs.entries(ent.topic), today.toordinal(), diff)
+        self.load.remove(ent.next_review)
+        if self.balance:
+            nxt = self.load.place(nxt, nxt - today.toordinal(), today.toordinal() + 1)
+        self.load.add(nxt)
+
+        ent.last_review = today.toordinal()
+        ent.next_review = nxt
+        ent.calendar_event_id = ""
+        nxt_date = ordinal_str(ent.next_review)
+        if self.scheduler.batch:
+            # Already planned with this review; the next load leaves it be
+            store = self.uploader.store
+            planned = json.loads(store.get_meta("plan_marks", "{}"))
+            planned[ent.topic] = self._log_mark(self.logs.entries(ent.topic))
+            store.set_meta("plan_marks", json.dumps(planned))
+
+        # Record updated last/next review; Drive and Calendar get it on the next flush
+        self._journal_event(ent, nxt_date)
+        self._save_bg(ent)
+        self.model.row_changed(ent)
 
     def start_upload(self, r):
         path, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF Files (*.pdf)")
         if not path:
             return
 
-        folder_id = self.data[r]["drive_folder_id"]
+        ent = self._entry(r)
+        folder_id = ent.drive_folder_id
 
         pd = QProgressDialog("Uploading…", None, 0, 0, self)
         pd.setWindowModality(Qt.WindowModality.WindowModal)
@@ -1027,159 +4130,206 @@ class ReviewApp(QMainWindow):
 
         # Use the bot uploader for the upload
         w = Worker(self.bot_uploader.upload_file, path, folder_id)
-        w.signals.finished.connect(lambda res, r=r, pd=pd: self._done_upload(res, r, pd))
+        w.signals.finished.connect(lambda res, ent=ent, pd=pd: self._done_upload(res, ent, pd))
         w.signals.error.connect(lambda m, pd=pd: (pd.close(), QMessageBox.critical(self, "Upload Error", m)))
         self.pool.start(w)
 
-    def _done_upload(self, res, r, pd):
+    def _done_upload(self, res, ent, pd):
         pd.close()
         fid, name, link = res
 
         # Update the topic's file list
-        ent = self.data[r]
-        lst = json.loads(ent.get("files") or "[]")
-        lst.append({"id": fid, "name": name, "link": link})
-        ent["files"] = json.dumps(lst)
-        for e in self.full_data:
-            if e["topic"] == ent["topic"]:
-                e.update(ent)
-                break
-        self._save_bg()
-        self.populate_table()
+        ent.files += (FileRef(fid, name, link),)
+        self._save_bg(ent)
+        self.model.row_changed(ent)
+        self._reindex(ent)
 
     def open_settings(self, r):
-        flist = json.loads(self.data[r].get("files") or "[]")
+        ent = self._entry(r)
+        flist = ent.files
         if not flist:
             QMessageBox.information(self, "No Files", "No files to manage.")
             return
 
-        dlg = SettingsDialog(flist, self)
-        if dlg.exec() != QDialogButtonBox.StandardButton.Ok:
+        dlg = SettingsDialog(flist, self, self.thumbs)
+        if dlg.exec() != QDialog.DialogCode.Accepted:
             return
 
         # Which file the user wants to delete:
         idx = dlg.selected_index()
         to_del = flist[idx]
 
-        # Show a little progress dialog while we delete
-        pd = QProgressDialog("Deleting file…", None, 0, 0, self)
-        pd.setWindowModality(Qt.WindowModality.WindowModal)
-        pd.setCancelButton(None)
-        pd.show()
-
-        def on_deleted(_):
-            pd.close()
-            # 1) Remove from our in-memory lists
-            new_list = [f for f in flist if f["id"] != to_del["id"]]
-            ent = self.data[r]
-            ent["files"] = json.dumps(new_list)
-            for e in self.full_data:
-                if e["topic"] == ent["topic"]:
-                    e.update(ent)
-                    break
-
-            # 2) Persist the cleaned-up CSV back to Drive
-            try:
-                self.uploader.write_csv(self.full_data)
-            except Exception as e:
-                QMessageBox.critical(self, "CSV Write Error", str(e))
-                return
-
-            # 3) Refresh the table & clear the PDF viewer
-            self.populate_table()
-            self.clear_pdf()
-
-        def on_error(msg):
-            pd.close()
-            QMessageBox.critical(self, "Delete Error", msg)
+        # 1) Journal the Drive delete; it is sent on the next flush
+        self.uploader.store.enqueue("delete", to_del.id, {"name": to_del.name})
 
-        # Fire off the real delete, then hook in our callbacks
-        w = Worker(self.bot_uploader.delete_file, to_del["id"])
-        w.signals.finished.connect(on_deleted)
-        w.signals.error.connect(on_error)
-        self.pool.start(w)
+        # 2) Remove from our in-memory lists and the local mirror
+        ent.files = tuple(f for f in flist if f.id != to_del.id)
+        self._reindex(ent)
+        try:
+            self._save_bg(ent)
+        except Exception as e:
+            QMessageBox.critical(self, "CSV Write Error", str(e))
+            return
 
-    def compute_stats(self):
-        total = len(self.full_data)
-        today = datetime.utcnow().date()
-        week = today + timedelta(days=7)
-        upc = sum(
-            1 for e in self.full_data
-            if QDate.fromString(e.get("next_review", ""), "yyyy-MM-dd").toPyDate() <= week
-        )
-        ints = []
-        for e in self.full_data:
-            lr = QDate.fromString(e.get("last_review", ""), "yyyy-MM-dd")
-            nr = QDate.fromString(e.get("next_review", ""), "yyyy-MM-dd")
-            if lr.isValid() and nr.isValid() and nr > lr:
-                ints.append((nr.toPyDate() - lr.toPyDate()).days)
-        avg = round(sum(ints) / len(ints), 1) if ints else 0
-        return {"Total Topics": total, "Upcoming ≤7d": upc, "Avg Interval(days)": avg}
+        # 3) Refresh the row & clear the PDF viewer
+        self.model.row_changed(ent)
+        self.clear_pdf()
 
     def open_dashboard(self):
-        stats = self.compute_stats()
-        dlg = DashboardDialog(stats, self)
+        report = self.stats.report(self.full_data, self.logs)
+        dlg = DashboardDialog(report["summary"], self, report)
         dlg.exec()
 
-    def _save_bg(self):
-        pass  # No longer needed since changes are written immediately
+    def _save_bg(self, *ents, removed=()):
+        """
+        Record the edited rows `ents` (and the `removed` ones) in the local
+        mirror and schedule a Drive push. Other rows are left untouched.
+        """
+        self.stats.invalidate()
+        store = self.uploader.store
+        n = store.upsert([e.to_csv() for e in ents]) if ents else 0
+        if removed:
+            n += store.remove([store.row_key(e.to_csv()) for e in removed])
+        if n or store.pending:
+            self._schedule_flush()
+
+    def _schedule_flush(self, delay=CSV_FLUSH_DELAY_MS):
+        # Restarting the timer coalesces bursts of edits into one upload
+        self.flush_timer.start(delay)
+
+    def _drain(self):
+        """
+        Send everything waiting in the local store, oldest kind first: the
+        CSV snapshot, study-log entries (one upload per month segment),
+        calendar changes (one listing, batched patches), then Drive deletes.
+        Ops leave the journal only once sent; a network error stops the
+        drain and the rest waits for the next attempt. Returns
+        {topic_key: event_id} for the calendar changes made.
+        """
+        store = self.uploader.store
+        self.uploader.flush_csv()
+        ops = store.journal()
+
+        logs = [op for op in ops if op[1] == "log"]
+        if logs:
+            self.uploader.append_logs([op[3] for op in logs])
+            store.journal_done([op[0] for op in logs])
+
+        events = {op[2]: op for op in ops if op[1] == "event"}
+        result = {}
+        if events:
+            result, failed = self.calendar.apply(
+                {key: (op[3]["topic"], op[3]["date"]) for key, op in events.items()}
+            )
+            store.journal_done([op[0] for key, op in events.items() if key not in failed])
+
+        for seq, kind, key, payload in ops:
+            if kind != "delete":
+                continue
+            try:
+                self.bot_uploader.delete_file(key)
+            except errors.HttpError as e:
+                # Gone already, or refused for good: nothing to retry
+                if e.resp.status >= 500 or e.resp.status == 429:
+                    raise
+                print("Dropping Drive delete of", payload.get("name", key), "-", e)
+            store.journal_done([seq])
+        return result
+
+    def _on_drained(self, result):
+        if not result:
+            return
+        changed = []
+        for ent in self.full_data:
+            key = CalendarManager.topic_key(ent)
+            if key in result:
+                ent.calendar_event_id = result[key]
+                changed.append(ent)
+        self._save_bg(*changed)
+
+    def _flush(self):
+        if self._flushing:
+            self._schedule_flush()
+            return
+        self._flushing = True
+
+        def done(result):
+            self._flushing = False
+            self._retry_ms = CSV_FLUSH_DELAY_MS
+            self._on_drained(result)
+            if self.uploader.store.pending:
+                self._schedule_flush()
+
+        def failed(msg):
+            # Probably offline: back off, but any new edit retries sooner
+            self._flushing = False
+            self._retry_ms = min(self._retry_ms * 2, FLUSH_RETRY_MAX_MS)
+            print(f"Push failed, retrying in {self._retry_ms // 1000}s:", msg)
+            self._schedule_flush(self._retry_ms)
+
+        w = Worker(self._drain)
+        w.signals.finished.connect(done)
+        w.signals.error.connect(failed)
+        self.pool.start(w)
 
     def add_topic(self, _=None):
         txt, ok = QInputDialog.getText(self, "New Topic", "Enter topic name:")
         if not (ok and txt.strip()):
             return
 
+        name = txt.strip()
+
+        def created(fid):
+            # Add the topic to the data
+            ent = ReviewRow(name, next_review=date.today().toordinal(), drive_folder_id=fid)
+            self.load.add(ent.next_review)
+            self.model.append_row(ent)
+            self._reindex(ent)
+            self._save_bg(ent)
+
         # Use the bot uploader to create the folder
-        fid = self.bot_uploader.create_topic_folder(txt.strip())
-
-        # Add the topic to the data
-        ent = {
-            "topic": txt.strip(),
-            "files": "[]",
-            "last_review": "",
-            "next_review": QDate.currentDate().toString("yyyy-MM-dd"),
-            "calendar_event_id": "",
-            "drive_folder_id": fid
-        }
-        self.full_data.append(ent)
-        self.data.append(ent)
-        self._save_bg()
-        self.populate_table()
+        w = Worker(self.bot_uploader.create_topic_folder, name)
+        w.signals.finished.connect(created)
+        w.signals.error.connect(lambda m: QMessageBox.critical(self, "Add Topic Error", m))
+        self.pool.start(w, OPEN_PRIORITY, key=("topic", name))
 
     def remove_topic(self, _=None):
-        r = self.table.currentRow()
+        r = self.table.currentIndex().row()
         if r < 0:
             return
-        ent = self.data[r]
-        if QMessageBox.question(self, "Confirm Delete", f"Delete '{ent['topic']}'?") \
+        ent = self._entry(r)
+        if QMessageBox.question(self, "Confirm Delete", f"Delete '{ent.topic}'?") \
            == QMessageBox.StandardButton.Yes:
-            self.calendar.delete_future_events(ent["topic"])
-            if ent.get("drive_folder_id"):
-                # Use the bot uploader to delete the folder
-                self.pool.start(Worker(self.bot_uploader.delete_folder, ent["drive_folder_id"]))
-            self.full_data.remove(ent)
-            self.data.remove(ent)
-            self._save_bg()
-            self.populate_table()
+            self._journal_event(ent, "")
+            if ent.drive_folder_id:
+                # Deleted with the bot uploader on the next flush
+                self.uploader.store.enqueue("delete", ent.drive_folder_id, {"name": ent.topic})
+            self.model.remove_row(ent)
+            self.load.remove(ent.next_review)
+            self.search.remove_topic(ent.topic)
+            self._save_bg(removed=(ent,))
             self.clear_pdf()
 
-        self.current_row = r
-        self.current_file_index = 0
-        self._open_file_by_index(r, 0)
+        # Move on to whatever row now sits at the same position
+        if self.proxy.rowCount():
+            self.table.setCurrentIndex(self.proxy.index(min(r, self.proxy.rowCount() - 1), 0))
 
     def open_next_file(self):
-        if self.current_row < 0:
+        if not self.current_index.isValid():
             return
         self.current_file_index += 1
-        self._open_file_by_index(self.current_row, self.current_file_index)
+        self._open_file_by_index(self.current_index.row(), self.current_file_index)
 
     def open_prev_file(self):
-        if self.current_row < 0:
+        if not self.current_index.isValid():
             return
         self.current_file_index -= 1
-        self._open_file_by_index(self.current_row, self.current_file_index)
+        self._open_file_by_index(self.current_index.row(), self.current_file_index)
 
     def ensure_root_shared(self):
+        store = self.uploader.store
+        if store.get_meta("root_shared") == USER_EMAIL:
+            return
         drive = self.bot_uploader.drive
         # 1) Get existing permissions on the root folder
         try:
@@ -1189,6 +4339,7 @@ class ReviewApp(QMainWindow):
             ).execute()
             perms = resp.get("permissions", [])
             if any(p.get("emailAddress") == USER_EMAIL for p in perms):
+                store.set_meta("root_shared", USER_EMAIL)
                 return  # Already shared
 
             # 2) Otherwise, create the permission
@@ -1200,11 +4351,14 @@ class ReviewApp(QMainWindow):
                     "emailAddress": USER_EMAIL
                 }
             ).execute()
-        except HttpError as e:
+            store.set_meta("root_shared", USER_EMAIL)
+        except errors.HttpError as e:
             # Log the error and move on
             print("Could not share root folder:", e)
 
 if __name__ == "__main__":
+    STARTUP.since_start("imports")
+    register_stream_scheme()
     app = QApplication(sys.argv)
     window = ReviewApp()
     # → don’t call window.show() yet!
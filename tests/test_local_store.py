@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("PyQt6.QtWebEngineWidgets")
+pytest.importorskip("googleapiclient")
+
+from app import LocalStore
+
+
+def _row(topic, folder, next_review=""):
+    return {"topic": topic, "files": "[]", "last_review": "", "next_review": next_review,
+            "calendar_event_id": "", "drive_folder_id": folder}
+
+
+def test_reconcile_keeps_local_edits_and_takes_remote_ones(tmp_path):
+    store = LocalStore(tmp_path / "local.db")
+    store.reconcile("csv", [_row("A", "a"), _row("B", "b")], "1")
+
+    # A edited here and not pushed yet; B edited on another device
+    store.upsert([_row("A", "a", "2026-01-10")])
+    rows = store.reconcile("csv", [_row("A", "a"), _row("B", "b", "2026-02-20")], "2")
+
+    by_key = {r["key"]: r for r in rows}
+    assert by_key["a"]["next_review"] == "2026-01-10"
+    assert by_key["b"]["next_review"] == "2026-02-20"